@@ -8,8 +8,27 @@ Access: http://localhost:18888
 
 import os
 import sys
-from http.server import HTTPServer, SimpleHTTPRequestHandler
-from pathlib import Path
+import bisect
+import codecs
+import cProfile
+import csv
+import hashlib
+import hmac
+import ipaddress
+import json
+import marshal
+import mmap
+import multiprocessing
+import random
+import stat
+import struct
+import time
+import threading
+import uuid
+from collections import Counter, OrderedDict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
 from datetime import datetime
 from urllib.parse import unquote, parse_qs, urlparse
 
@@ -19,6 +38,1462 @@ sys.stderr.reconfigure(encoding='utf-8')
 PORT = 18888
 WORKSPACE = "/home/yuan/.openclaw/workspace"
 
+# 目录快照缓存最多保留的目录数
+LISTING_CACHE_MAX_DIRS = 4096
+# /api/stat：并行 stat 线程数、单次请求路径数上限、复用目录快照的最大时长（秒）
+STAT_WORKERS = 16
+STAT_MAX_PATHS = 10000
+STAT_CACHE_MAX_AGE = 2.0
+# 运行状态目录（目录快照等），应位于工作区之外
+STATE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'workspace-browser')
+# 目录快照写盘间隔（秒）
+SNAPSHOT_SAVE_INTERVAL = 60
+# 内容嗅探读取的字节数、分类缓存条目上限
+SNIFF_BYTES = 8192
+CLASSIFY_CACHE_MAX = 65536
+# 列表页最多为多少个文件附带内容分类，超出部分由前端按扩展名/响应类型判断
+CLASSIFY_LISTING_MAX = 2000
+# /api/bytes 单次最多读取的字节数
+BYTES_MAX_LENGTH = 64 * 1024
+# 表格预览：每隔多少行记录一次字节偏移、单页最多行数、缓存的文件版本数、后台统计线程数、
+# 单条记录最大字节数（超出时该记录只取首行并标记为无效）
+TABLE_INDEX_STRIDE = 1000
+TABLE_PAGE_MAX_ROWS = 500
+TABLE_CACHE_MAX = 64
+TABLE_STATS_WORKERS = 2
+TABLE_RECORD_MAX = 1024 * 1024
+# /api/hash：支持的算法、读缓冲大小、并行度、不超过该大小的文件直接在线程内计算
+HASH_ALGORITHMS = ('sha256', 'md5', 'blake2b')
+HASH_BUFFER_SIZE = 1024 * 1024
+HASH_WORKERS = os.cpu_count() or 4
+HASH_INLINE_MAX = 4 * 1024 * 1024
+# 重复文件查找：忽略小于该大小的文件、首尾部分摘要各读取的字节数、每批并行处理的文件数、
+# 报告中最多列出的分组数、保留的任务数
+DUPLICATES_MIN_SIZE = 1
+DUPLICATES_PARTIAL_BYTES = 64 * 1024
+DUPLICATES_BATCH = 1024
+DUPLICATES_MAX_GROUPS = 1000
+DUPLICATES_MAX_JOBS = 8
+# 最近修改文件：全量重新遍历的间隔（秒），/api/recent 默认与最多返回的文件数
+RECENT_RESCAN_INTERVAL = 300
+RECENT_DEFAULT_LIMIT = 50
+RECENT_MAX_LIMIT = 1000
+# 按需性能分析：随机采样比例（0 为关闭）、保留 profile 的慢请求阈值（毫秒）、最多保留的 profile 数、
+# 调用栈采样间隔（秒）；PROFILE_TOKEN 为空时只有本机可以使用 ?profile=1 和 /api/profiles
+PROFILE_SAMPLE_RATE = 0.0
+PROFILE_SLOW_MS = 500
+PROFILE_MAX_KEEP = 32
+PROFILE_STACK_INTERVAL = 0.005
+PROFILE_TOKEN = ''
+
+# 目录项记录，kind 为 'dir' / 'file' / 'other'
+EntryRecord = namedtuple('EntryRecord', 'name kind size mtime_ns dev ino')
+# 目录快照，mtime_ns 为扫描时目录自身的修改时间，用于判断快照是否过期
+DirSnapshot = namedtuple('DirSnapshot', 'mtime_ns scanned_at entries')
+
+STAT_POOL = ThreadPoolExecutor(max_workers=STAT_WORKERS, thread_name_prefix='stat')
+
+def file_etag(size, mtime_ns):
+    """根据文件大小和纳秒级修改时间生成 ETag"""
+    return f'"{size:x}-{mtime_ns:x}"'
+
+def resolve_workspace_path(rel_path):
+    """把工作区相对路径转换为绝对路径，越出工作区时返回 None"""
+    root = os.path.abspath(WORKSPACE)
+    full = os.path.normpath(os.path.join(root, rel_path.lstrip('/')))
+    if full != root and not full.startswith(root + os.sep):
+        return None
+    return full
+
+def entry_kind(mode):
+    if stat.S_ISDIR(mode):
+        return 'dir'
+    if stat.S_ISREG(mode):
+        return 'file'
+    return 'other'
+
+def scan_directory(path):
+    """扫描目录，返回目录优先、按名称排序的 DirSnapshot（包含隐藏文件）"""
+    # 先取目录 mtime：扫描期间目录若被修改，下次访问会因 mtime 不符而重新扫描
+    mtime_ns = os.stat(path).st_mtime_ns
+    scanned_at = time.time()
+    entries = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                st = entry.stat()
+            except OSError:
+                # 失效的符号链接等
+                entries.append(EntryRecord(entry.name, 'other', 0, 0, 0, 0))
+                continue
+            entries.append(EntryRecord(
+                entry.name, entry_kind(st.st_mode), st.st_size, st.st_mtime_ns, st.st_dev, st.st_ino))
+    entries.sort(key=lambda e: (e.kind != 'dir', e.name.lower()))
+    return DirSnapshot(mtime_ns, scanned_at, tuple(entries))
+
+# 目录快照磁盘格式：文件头 | 各目录的目录项块 | 目录索引（位于文件末尾）
+SNAPSHOT_MAGIC = b'WSBSNAP2'
+SNAPSHOT_HEADER = struct.Struct('<8sIQ')    # magic, 目录数, 索引偏移
+SNAPSHOT_ENTRY = struct.Struct('<BqqQQH')   # kind, size, mtime_ns, dev, ino, 名称长度（后接名称字节）
+SNAPSHOT_DIR = struct.Struct('<qdQIH')      # mtime_ns, scanned_at, 块偏移, 块长度, 路径长度（后接路径字节）
+ENTRY_KINDS = ('dir', 'file', 'other')
+ENTRY_KIND_CODES = {kind: i for i, kind in enumerate(ENTRY_KINDS)}
+
+# 磁盘快照中单个目录的索引信息
+SnapshotMeta = namedtuple('SnapshotMeta', 'mtime_ns scanned_at offset length')
+
+def encode_entries(entries):
+    parts = []
+    for e in entries:
+        name = os.fsencode(e.name)
+        parts.append(SNAPSHOT_ENTRY.pack(ENTRY_KIND_CODES[e.kind], e.size, e.mtime_ns, e.dev, e.ino, len(name)))
+        parts.append(name)
+    return b''.join(parts)
+
+def decode_entries(block):
+    entries = []
+    pos = 0
+    while pos < len(block):
+        kind, size, mtime_ns, dev, ino, name_len = SNAPSHOT_ENTRY.unpack_from(block, pos)
+        pos += SNAPSHOT_ENTRY.size
+        name = os.fsdecode(block[pos:pos + name_len])
+        pos += name_len
+        entries.append(EntryRecord(name, ENTRY_KINDS[kind], size, mtime_ns, dev, ino))
+    return tuple(entries)
+
+def read_snapshot_index(buf):
+    """解析快照文件末尾的目录索引，返回 {目录路径: SnapshotMeta}"""
+    magic, count, index_offset = SNAPSHOT_HEADER.unpack_from(buf, 0)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError('unknown snapshot format')
+    index = {}
+    pos = index_offset
+    for _ in range(count):
+        mtime_ns, scanned_at, offset, length, path_len = SNAPSHOT_DIR.unpack_from(buf, pos)
+        pos += SNAPSHOT_DIR.size
+        path = os.fsdecode(buf[pos:pos + path_len])
+        pos += path_len
+        index[path] = SnapshotMeta(mtime_ns, scanned_at, offset, length)
+    return index
+
+def write_snapshot_file(filename, blocks):
+    """blocks 为 (目录路径, mtime_ns, scanned_at, 目录项块) 列表；先写临时文件再原子替换"""
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    tmp = filename + '.tmp'
+    index = []
+    offset = SNAPSHOT_HEADER.size
+    with open(tmp, 'wb') as f:
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, 0, 0))
+        for path, mtime_ns, scanned_at, block in blocks:
+            f.write(block)
+            encoded = os.fsencode(path)
+            index.append(SNAPSHOT_DIR.pack(mtime_ns, scanned_at, offset, len(block), len(encoded)) + encoded)
+            offset += len(block)
+        f.write(b''.join(index))
+        f.seek(0)
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(blocks), offset))
+    os.replace(tmp, filename)
+
+class SingleFlight:
+    """合并相同 key 的并发调用：同一时刻只执行一次，其余调用等待并共享结果（或异常）
+    
+    按命名空间统计调用次数 calls、实际执行次数 executed、被合并次数 coalesced
+    与绕过合并的次数 bypassed。
+    """
+    
+    def __init__(self):
+        self._calls = {}
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    def set_bypass(self, enabled):
+        """当前线程的调用是否绕过合并、单独执行（用于被分析而变慢的请求，避免其他请求等待它）"""
+        self._local.bypass = enabled
+    
+    def do(self, namespace, key, fn):
+        bypass = getattr(self._local, 'bypass', False)
+        with self._lock:
+            metrics = self._metrics.setdefault(
+                namespace, {'calls': 0, 'executed': 0, 'coalesced': 0, 'bypassed': 0})
+            metrics['calls'] += 1
+            if bypass:
+                metrics['bypassed'] += 1
+            else:
+                call = self._calls.get((namespace, key))
+                leader = call is None
+                if leader:
+                    call = self._calls[(namespace, key)] = {'done': threading.Event()}
+                    metrics['executed'] += 1
+                else:
+                    metrics['coalesced'] += 1
+        if bypass:
+            return fn()
+        if not leader:
+            call['done'].wait()
+            if 'error' in call:
+                raise call['error']
+            return call['result']
+        try:
+            call['result'] = fn()
+            return call['result']
+        except BaseException as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[(namespace, key)]
+            call['done'].set()
+    
+    def metrics(self):
+        with self._lock:
+            result = {namespace: dict(m) for namespace, m in self._metrics.items()}
+            for namespace, _ in self._calls:
+                result[namespace]['in_flight'] = result[namespace].get('in_flight', 0) + 1
+        return result
+
+SINGLE_FLIGHT = SingleFlight()
+
+class ListingCache:
+    """目录快照的 LRU 缓存，以目录 mtime 判断快照是否仍然有效
+    
+    可从磁盘快照（mmap）预热：启动时只解析目录索引，目录项在首次访问、
+    且目录 mtime 校验通过时才解码。
+    """
+    
+    def __init__(self, max_dirs):
+        self.max_dirs = max_dirs
+        self._snapshots = OrderedDict()
+        self._persisted = {}
+        self._mm = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        # 新扫描的快照会通知这些回调 (目录, 快照)
+        self.listeners = []
+    
+    def peek(self, path, max_age=None):
+        """缓存有效时返回快照，否则返回 None，不触发扫描"""
+        path = os.path.normpath(path)
+        with self._lock:
+            snapshot = self._snapshots.get(path)
+            meta = self._persisted.get(path) if snapshot is None else None
+        if snapshot is None and meta is None:
+            return None
+        mtime_ns, scanned_at = (snapshot or meta)[:2]
+        if max_age is not None and time.time() - scanned_at > max_age:
+            return None
+        try:
+            current_mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            current_mtime_ns = None
+        if current_mtime_ns != mtime_ns:
+            if meta is not None:
+                # 磁盘快照已过期，下次写盘时丢弃
+                with self._lock:
+                    self._persisted.pop(path, None)
+                    self._dirty = True
+            return None
+        if snapshot is None:
+            snapshot = self._decode_persisted(path)
+            if snapshot is None:
+                return None
+        self._remember(path, snapshot)
+        return snapshot
+    
+    def get(self, path, max_age=None):
+        """返回目录快照，缓存失效时重新扫描"""
+        snapshot = self.peek(path, max_age)
+        if snapshot is None:
+            snapshot = SINGLE_FLIGHT.do('scan', os.path.normpath(path), lambda: self._scan(path))
+        return snapshot
+    
+    def _scan(self, path):
+        snapshot = scan_directory(path)
+        self.store(path, snapshot)
+        return snapshot
+    
+    def refresh_files(self, path, snapshot):
+        """并行重新 stat 快照中的文件项，返回最新的快照
+        
+        原地修改文件不会改变目录 mtime，目录项列表可以复用，但文件大小/mtime 需要逐个校验；
+        有变化时写回缓存。
+        """
+        def restat(record):
+            if record.kind != 'file':
+                return record
+            try:
+                st = os.stat(os.path.join(path, record.name))
+            except OSError:
+                return record
+            if (st.st_size, st.st_mtime_ns, st.st_dev, st.st_ino) == record[2:]:
+                return record
+            return EntryRecord(record.name, entry_kind(st.st_mode), st.st_size, st.st_mtime_ns, st.st_dev, st.st_ino)
+        entries = tuple(STAT_POOL.map(restat, snapshot.entries))
+        if all(new is old for new, old in zip(entries, snapshot.entries)):
+            return snapshot
+        snapshot = snapshot._replace(entries=entries)
+        self.store(path, snapshot)
+        return snapshot
+    
+    def store(self, path, snapshot):
+        path = os.path.normpath(path)
+        self._remember(path, snapshot)
+        with self._lock:
+            self._dirty = True
+        for listener in self.listeners:
+            listener(path, snapshot)
+    
+    def _remember(self, path, snapshot):
+        with self._lock:
+            self._snapshots[path] = snapshot
+            self._snapshots.move_to_end(path)
+            while len(self._snapshots) > self.max_dirs:
+                self._snapshots.popitem(last=False)
+    
+    def _decode_persisted(self, path):
+        # 在锁内复制目录项块：写盘后 mmap 会被替换，偏移量随之变化
+        with self._lock:
+            meta = self._persisted.get(path)
+            if meta is None:
+                return None
+            block = self._mm[meta.offset:meta.offset + meta.length]
+        return DirSnapshot(meta.mtime_ns, meta.scanned_at, decode_entries(block))
+    
+    def load(self, filename):
+        """载入磁盘快照，返回其中的目录数；文件不存在或格式不符时冷启动"""
+        try:
+            with open(filename, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return 0
+        try:
+            index = read_snapshot_index(mm)
+        except (struct.error, ValueError, IndexError):
+            mm.close()
+            return 0
+        with self._lock:
+            if self._mm is not None:
+                self._mm.close()
+            self._mm = mm
+            self._persisted = index
+        return len(index)
+    
+    def save(self, filename):
+        """有变更时把内存中的快照与尚未访问的磁盘快照一起写回磁盘"""
+        with self._lock:
+            if not self._dirty:
+                return False
+            live = list(self._snapshots.items())
+            carried = [
+                (path, meta, self._mm[meta.offset:meta.offset + meta.length])
+                for path, meta in self._persisted.items() if path not in self._snapshots
+            ]
+            self._dirty = False
+        blocks = [(path, s.mtime_ns, s.scanned_at, encode_entries(s.entries)) for path, s in live]
+        blocks += [(path, meta.mtime_ns, meta.scanned_at, block) for path, meta, block in carried]
+        try:
+            write_snapshot_file(filename, blocks)
+        except OSError as e:
+            with self._lock:
+                self._dirty = True
+            print(f"⚠️ Failed to save listing snapshot: {e}", file=sys.stderr)
+            return False
+        self.load(filename)
+        return True
+
+LISTING_CACHE = ListingCache(LISTING_CACHE_MAX_DIRS)
+
+def snapshot_file():
+    return os.path.join(STATE_DIR, 'listing.snap')
+
+def start_snapshot_saver():
+    """后台定期把有变更的目录快照写盘"""
+    def run():
+        while True:
+            time.sleep(SNAPSHOT_SAVE_INTERVAL)
+            LISTING_CACHE.save(snapshot_file())
+    threading.Thread(target=run, name='snapshot-saver', daemon=True).start()
+
+class LRUCache:
+    """线程安全的定长 LRU 字典；on_evict(key, value) 在条目被挤出时调用"""
+    
+    def __init__(self, max_entries, on_evict=None):
+        self.max_entries = max_entries
+        self.on_evict = on_evict
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+    
+    def put(self, key, value):
+        evicted = []
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                evicted.append(self._data.popitem(last=False))
+        if self.on_evict:
+            for item in evicted:
+                self.on_evict(*item)
+
+# 带 BOM 的编码；UTF-32 的 BOM 以 UTF-16 的 BOM 开头，需先判断
+TEXT_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF32_LE, 'utf-32le'),
+    (codecs.BOM_UTF32_BE, 'utf-32be'),
+    (codecs.BOM_UTF16_LE, 'utf-16le'),
+    (codecs.BOM_UTF16_BE, 'utf-16be'),
+)
+# 文本中不应出现的控制字符（保留 \b \t \n \f \r 和 ESC）
+BINARY_CONTROL_BYTES = bytes(b for b in range(32) if b not in (8, 9, 10, 12, 13, 27)) + b'\x7f'
+
+CLASSIFY_CACHE = LRUCache(CLASSIFY_CACHE_MAX)
+
+def decodes_as(head, encoding):
+    """head 能否按 encoding 解码；末尾被截断的多字节字符不算错误"""
+    try:
+        return codecs.getincrementaldecoder(encoding)().decode(head, final=False)
+    except UnicodeDecodeError:
+        return None
+
+def sniff_content(head):
+    """根据文件开头的字节判断内容类型，返回 (kind, encoding)，kind 为 'text' / 'binary'
+    
+    encoding 使用浏览器 TextDecoder 也能识别的名称。
+    """
+    if not head:
+        return ('text', 'utf-8')
+    for bom, encoding in TEXT_BOMS:
+        if head.startswith(bom):
+            return ('text', encoding)
+    if b'\x00' in head:
+        return ('binary', None)
+    controls = len(head) - len(head.translate(None, BINARY_CONTROL_BYTES))
+    if controls * 10 > len(head):
+        return ('binary', None)
+    if decodes_as(head, 'utf-8') is not None:
+        return ('text', 'utf-8')
+    # 非 UTF-8 时尝试 GB18030（GBK 的超集）：非 ASCII 字符应大多是中日韩文字或全角符号
+    text = decodes_as(head, 'gb18030')
+    if text is not None:
+        wide = [c for c in text if ord(c) >= 0x80]
+        cjk = sum(1 for c in wide if '\u3000' <= c <= '\u9fff' or '\uff00' <= c <= '\uffef')
+        if cjk * 10 >= len(wide) * 8:
+            return ('text', 'gb18030')
+    # 单字节编码：高位字节占比不高时按 Latin-1 处理
+    high = sum(1 for b in head if b >= 0x80)
+    if high * 10 <= len(head) * 3:
+        return ('text', 'iso-8859-1')
+    return ('binary', None)
+
+def file_key(st):
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+def record_key(record):
+    return (record.dev, record.ino, record.size, record.mtime_ns)
+
+def classify_file(path, key):
+    """嗅探文件开头 SNIFF_BYTES 字节判断内容类型，结果按 (dev, inode, size, mtime) 缓存"""
+    result = CLASSIFY_CACHE.get(key)
+    if result is None:
+        result = SINGLE_FLIGHT.do('classify', key, lambda: _classify_uncached(path, key))
+    return result
+
+def _classify_uncached(path, key):
+    with open(path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+    result = sniff_content(head)
+    CLASSIFY_CACHE.put(key, result)
+    return result
+
+def classify_entries(dir_path, records):
+    """批量分类目录中的文件，返回 {文件名: (kind, encoding)}；缓存未命中的在线程池中并行嗅探"""
+    def classify(record):
+        try:
+            return classify_file(os.path.join(dir_path, record.name), record_key(record))
+        except OSError:
+            return None
+    results = STAT_POOL.map(classify, records)
+    return {record.name: result for record, result in zip(records, results) if result}
+
+def read_file_range(path, offset, length):
+    """用 pread 读取文件 [offset, offset + length) 区间，返回 (数据, stat 结果)"""
+    fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        st = os.fstat(fd)
+        if offset >= st.st_size:
+            return b'', st
+        if hasattr(os, 'pread'):
+            data = os.pread(fd, length, offset)
+        else:
+            os.lseek(fd, offset, os.SEEK_SET)
+            data = os.read(fd, length)
+        return data, st
+    finally:
+        os.close(fd)
+
+# 表格预览支持的扩展名及对应格式
+TABLE_FORMATS = {'csv': 'csv', 'tsv': 'tsv', 'tab': 'tsv', 'jsonl': 'jsonl', 'ndjson': 'jsonl'}
+# 列统计中字符串 min/max 的最大长度
+TABLE_STATS_TEXT_MAX = 100
+
+TABLE_STATS_POOL = ThreadPoolExecutor(max_workers=TABLE_STATS_WORKERS, thread_name_prefix='table-stats')
+
+# 单个字段可达一条记录的上限（默认只有 128 KB）
+csv.field_size_limit(max(csv.field_size_limit(), TABLE_RECORD_MAX))
+
+def read_capped_line(f, limit):
+    """读取一行，超过 limit 字节时丢弃该行剩余部分；返回 (行, 是否超长)"""
+    line = f.readline(limit)
+    if len(line) < limit or line.endswith(b'\n'):
+        return line, False
+    while True:
+        rest = f.readline(limit)
+        if not rest or rest.endswith(b'\n'):
+            return line, True
+
+class CsvLineSource:
+    """把二进制文件逐行解码后交给 csv.reader，由它决定记录边界
+    
+    记录当前记录已读取的字节数和首行内容；记录超过 TABLE_RECORD_MAX 时抛出 csv.Error，
+    调用方回退到首行末尾继续。
+    """
+    
+    def __init__(self, f, codec):
+        self.f = f
+        self.codec = codec
+        self.start_record()
+    
+    def start_record(self):
+        self.record_bytes = 0
+        self.first_line = None
+        self.first_line_end = None
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        line, too_long = read_capped_line(self.f, TABLE_RECORD_MAX)
+        if not line:
+            raise StopIteration
+        text = line.decode(self.codec, errors='replace')
+        if self.first_line is None:
+            self.first_line = text
+            self.first_line_end = self.f.tell()
+        self.record_bytes += len(line)
+        if too_long or self.record_bytes > TABLE_RECORD_MAX:
+            raise csv.Error('record too large')
+        return text
+
+def table_value_type(value):
+    """推断单元格类型，返回 (类型, 用于比较的值)；空值返回 (None, None)"""
+    if value is None or value == '':
+        return (None, None)
+    if isinstance(value, bool):
+        return ('bool', value)
+    if isinstance(value, int):
+        return ('int', value)
+    if isinstance(value, float):
+        return ('float', value)
+    if isinstance(value, (dict, list)):
+        return ('object', None)
+    try:
+        return ('int', int(value))
+    except ValueError:
+        pass
+    try:
+        number = float(value)
+    except ValueError:
+        return ('string', value[:TABLE_STATS_TEXT_MAX])
+    if number != number or number in (float('inf'), float('-inf')):
+        # NaN / inf 无法写入 JSON，按字符串处理
+        return ('string', value[:TABLE_STATS_TEXT_MAX])
+    return ('float', number)
+
+class ColumnStats:
+    """单列的类型、空值数与最小/最大值"""
+    
+    def __init__(self, name):
+        self.name = name
+        self.types = set()
+        self.count = 0
+        self.nulls = 0
+        self.min = None
+        self.max = None
+    
+    def add(self, value):
+        kind, comparable = table_value_type(value)
+        if kind is None:
+            self.nulls += 1
+            return
+        self.count += 1
+        self.types.add(kind)
+        if comparable is None:
+            return
+        # 数值与字符串混杂时不再比较大小
+        if self.min is not None and isinstance(comparable, str) != isinstance(self.min, str):
+            self.min = self.max = None
+            self.types.add('mixed')
+            return
+        if 'mixed' in self.types:
+            return
+        if self.min is None or comparable < self.min:
+            self.min = comparable
+        if self.max is None or comparable > self.max:
+            self.max = comparable
+    
+    def summary(self):
+        types = self.types - {'mixed'}
+        if not types:
+            kind = 'empty'
+        elif types == {'int', 'float'}:
+            kind = 'float'
+        elif len(types) == 1 and 'mixed' not in self.types:
+            kind = types.pop()
+        else:
+            kind = 'mixed'
+        return {'name': self.name, 'type': kind, 'count': self.count, 'nulls': self.nulls,
+                'min': self.min, 'max': self.max}
+
+class TableFile:
+    """CSV/TSV/JSONL 文件（某一版本）的流式分页读取
+    
+    每 TABLE_INDEX_STRIDE 行记录一次起始字节偏移（稀疏行索引），翻页时从最近的
+    检查点开始读取；索引由翻页请求和后台统计任务中先到达前沿的一方推进。
+    """
+    
+    def __init__(self, path, fmt, encoding, size):
+        self.path = path
+        self.fmt = fmt
+        self.codec = text_codec(encoding)
+        self.size = size
+        self.columns = []
+        self._column_set = set()
+        self._lock = threading.Lock()
+        with open(path, 'rb') as f:
+            if fmt != 'jsonl':
+                header = next(self._records(f), (None, 0))[0]
+                self._add_columns(header if isinstance(header, list) else [])
+            self.data_start = f.tell()
+        self.checkpoints = [self.data_start]
+        self.indexed_rows = 0
+        self.total_rows = None
+        self.stats_state = 'running'
+        self.cancelled = False
+        self.stats_rows = 0
+        self.stats_bytes = self.data_start
+        self.column_stats = None
+        TABLE_STATS_POOL.submit(self._compute_stats)
+    
+    def _records(self, f):
+        """从 f 的当前位置逐条产出 (解析结果, 记录结束偏移)
+        
+        CSV/TSV 解析为字段列表，JSONL 为 dict；无法解析的记录为 {'_invalid': 首行内容}。
+        """
+        if self.fmt != 'csv':
+            while True:
+                line, too_long = read_capped_line(f, TABLE_RECORD_MAX)
+                if not line:
+                    return
+                text = line.decode(self.codec, errors='replace')
+                yield (self._invalid(text) if too_long else self._parse_line(text)), f.tell()
+        # CSV 引号内可以有换行，记录边界交给 csv.reader 判断
+        source = CsvLineSource(f, self.codec)
+        reader = csv.reader(source)
+        while True:
+            source.start_record()
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error:
+                # 未闭合的引号、超长记录等：只把首行计为一条无效记录，从下一行继续
+                if source.first_line is None:
+                    return
+                f.seek(source.first_line_end)
+                row = self._invalid(source.first_line)
+            yield row, f.tell()
+    
+    def _parse_line(self, text):
+        text = text.rstrip('\r\n')
+        if self.fmt == 'tsv':
+            try:
+                return next(csv.reader([text], delimiter='\t', quoting=csv.QUOTE_NONE), [])
+            except csv.Error:
+                return self._invalid(text)
+        if not text.strip():
+            return {}
+        try:
+            value = json.loads(text)
+        except ValueError:
+            return self._invalid(text)
+        return value if isinstance(value, dict) else {'value': value}
+    
+    @staticmethod
+    def _invalid(text):
+        return {'_invalid': text.rstrip('\r\n')[:TABLE_STATS_TEXT_MAX]}
+    
+    def _add_columns(self, names):
+        with self._lock:
+            for name in names:
+                if name not in self._column_set:
+                    self._column_set.add(name)
+                    self.columns.append(name)
+    
+    def _cells(self, row):
+        """把解析结果转换为 {列名: 值}"""
+        if isinstance(row, dict):
+            return row
+        columns = self.columns
+        cells = dict(zip(columns, row))
+        # 多出来的字段按位置命名
+        for i in range(len(columns), len(row)):
+            cells[f'#{i + 1}'] = row[i]
+        return cells
+    
+    def _note_row_end(self, row, end_offset):
+        """第 row 行（从 0 计）结束于 end_offset；恰好位于索引前沿时推进索引"""
+        with self._lock:
+            if row != self.indexed_rows:
+                return
+            self.indexed_rows = row + 1
+            if self.indexed_rows % TABLE_INDEX_STRIDE == 0:
+                self.checkpoints.append(end_offset)
+    
+    def _note_eof(self, rows):
+        with self._lock:
+            if rows == self.indexed_rows:
+                self.total_rows = rows
+    
+    def read_rows(self, start, limit):
+        """返回从第 start 行开始的至多 limit 行，每行为 {列名: 值}"""
+        with self._lock:
+            k = min(start // TABLE_INDEX_STRIDE, len(self.checkpoints) - 1)
+            offset = self.checkpoints[k]
+        row = k * TABLE_INDEX_STRIDE
+        rows = []
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            records = self._records(f)
+            while len(rows) < limit:
+                record = next(records, None)
+                if record is None:
+                    self._note_eof(row)
+                    break
+                parsed, end_offset = record
+                self._note_row_end(row, end_offset)
+                if row >= start:
+                    cells = self._cells(parsed)
+                    self._add_columns(cells)
+                    rows.append(cells)
+                row += 1
+        return rows
+    
+    def _compute_stats(self):
+        stats = {}
+        row = 0
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self.data_start)
+                for parsed, end_offset in self._records(f):
+                    if self.cancelled:
+                        self.stats_state = 'cancelled'
+                        return
+                    self._note_row_end(row, end_offset)
+                    cells = self._cells(parsed)
+                    for name, value in cells.items():
+                        column = stats.get(name)
+                        if column is None:
+                            column = stats[name] = ColumnStats(name)
+                            # 之前的行没有该列，计为空值
+                            column.nulls = row
+                        column.add(value)
+                    for name, column in stats.items():
+                        if name not in cells:
+                            column.nulls += 1
+                    row += 1
+                    if row % TABLE_INDEX_STRIDE == 0:
+                        self.stats_rows = row
+                        self.stats_bytes = f.tell()
+                self._note_eof(row)
+            self._add_columns(stats)
+            self.column_stats = [stats[name].summary() for name in self.columns if name in stats]
+            self.stats_rows = row
+            self.stats_bytes = self.size
+            self.stats_state = 'done'
+        except Exception:
+            self.stats_state = 'error'
+    
+    def cancel(self):
+        """停止后台统计：文件已有新版本或已移出缓存"""
+        self.cancelled = True
+    
+    def status(self):
+        return {
+            'state': self.stats_state,
+            'rows_scanned': self.stats_rows,
+            'bytes_scanned': self.stats_bytes,
+            'size': self.size,
+            'columns': self.column_stats,
+        }
+
+# 每个路径最新的 TableFile；同一路径同一时刻只保留一个后台统计任务
+TABLE_LATEST = {}
+TABLE_LATEST_LOCK = threading.Lock()
+
+def _table_evicted(key, table):
+    table.cancel()
+    with TABLE_LATEST_LOCK:
+        if TABLE_LATEST.get(table.path) is table:
+            del TABLE_LATEST[table.path]
+
+TABLE_CACHE = LRUCache(TABLE_CACHE_MAX, on_evict=_table_evicted)
+
+def open_table(path):
+    """返回文件当前版本的 TableFile，按 (dev, inode, size, mtime) 缓存；不支持时抛出 ValueError"""
+    fmt = TABLE_FORMATS.get(path.rsplit('.', 1)[-1].lower())
+    if fmt is None:
+        raise ValueError('Unsupported table format')
+    st = os.stat(path)
+    key = file_key(st)
+    table = TABLE_CACHE.get(key)
+    if table is None:
+        # 并发打开同一文件时只建一个 TableFile，避免重复的后台统计扫描
+        table = SINGLE_FLIGHT.do('table', key, lambda: _open_table_uncached(path, fmt, key, st.st_size))
+    return table
+
+def _open_table_uncached(path, fmt, key, size):
+    kind, encoding = classify_file(path, key)
+    # 按行切分依赖 ASCII 兼容编码
+    if kind != 'text' or encoding.startswith(('utf-16', 'utf-32')):
+        raise ValueError('Not an ASCII-compatible text file')
+    table = TableFile(path, fmt, encoding, size)
+    TABLE_CACHE.put(key, table)
+    # 文件被修改（如持续追加）时取消旧版本尚未完成的统计
+    with TABLE_LATEST_LOCK:
+        previous = TABLE_LATEST.get(path)
+        TABLE_LATEST[path] = table
+    if previous is not None:
+        previous.cancel()
+    return table
+
+def hash_file(path, algo):
+    """以大块缓冲顺序读取文件计算摘要（在子进程中执行）"""
+    digest = hashlib.new(algo)
+    buf = bytearray(HASH_BUFFER_SIZE)
+    view = memoryview(buf)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            digest.update(view[:n])
+    return digest.hexdigest()
+
+# 持久化摘要记录：dev, ino, size, mtime_ns, 算法编号, 摘要长度（后接摘要字节）
+HASH_RECORD = struct.Struct('<QQqqBB')
+
+class HashCache:
+    """文件摘要缓存，键为 (dev, inode, size, mtime_ns, 算法)
+    
+    open() 之后新结果以追加方式写入磁盘，重启后仍然有效。
+    """
+    
+    def __init__(self):
+        self._digests = {}
+        self._file = None
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            return self._digests.get(key)
+    
+    def put(self, key, digest):
+        with self._lock:
+            if self._digests.get(key) == digest:
+                return
+            self._digests[key] = digest
+            if self._file is not None:
+                try:
+                    self._file.write(self._encode(key, digest))
+                    self._file.flush()
+                except OSError as e:
+                    # 磁盘写满等：之后只在内存中缓存
+                    print(f"⚠️ Failed to write hash cache: {e}", file=sys.stderr)
+                    self._close_file()
+    
+    def _close_file(self):
+        try:
+            self._file.close()
+        except OSError:
+            pass
+        self._file = None
+    
+    @staticmethod
+    def _encode(key, digest):
+        dev, ino, size, mtime_ns, algo = key
+        raw = bytes.fromhex(digest)
+        return HASH_RECORD.pack(dev, ino, size, mtime_ns, HASH_ALGORITHMS.index(algo), len(raw)) + raw
+    
+    def open(self, filename):
+        """载入已有记录并以追加模式打开；重复记录过多或末尾残缺时先压缩重写
+        
+        文件无法读写时给出警告，只使用内存缓存。
+        """
+        try:
+            with open(filename, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b''
+        except OSError as e:
+            print(f"⚠️ Failed to load hash cache: {e}", file=sys.stderr)
+            data = b''
+        digests = {}
+        records = 0
+        pos = 0
+        while pos + HASH_RECORD.size <= len(data):
+            dev, ino, size, mtime_ns, algo, length = HASH_RECORD.unpack_from(data, pos)
+            raw = data[pos + HASH_RECORD.size:pos + HASH_RECORD.size + length]
+            if len(raw) < length or algo >= len(HASH_ALGORITHMS):
+                break
+            pos += HASH_RECORD.size + length
+            digests[(dev, ino, size, mtime_ns, HASH_ALGORITHMS[algo])] = raw.hex()
+            records += 1
+        with self._lock:
+            digests.update(self._digests)
+            self._digests = digests
+            try:
+                os.makedirs(os.path.dirname(filename), exist_ok=True)
+                if pos < len(data) or records > 2 * len(digests) or len(digests) > records:
+                    tmp = filename + '.tmp'
+                    with open(tmp, 'wb') as f:
+                        f.write(b''.join(self._encode(key, digest) for key, digest in digests.items()))
+                    os.replace(tmp, filename)
+                self._file = open(filename, 'ab')
+            except OSError as e:
+                print(f"⚠️ Failed to open hash cache: {e}", file=sys.stderr)
+                self._file = None
+        return len(digests)
+
+HASH_CACHE = HashCache()
+HASH_DISPATCH_POOL = ThreadPoolExecutor(max_workers=HASH_WORKERS * 2, thread_name_prefix='hash')
+_hash_process_pool = None
+_hash_process_pool_lock = threading.Lock()
+
+def hash_process_pool(reset=False):
+    """惰性创建摘要计算进程池；reset=True 时丢弃已损坏的进程池"""
+    global _hash_process_pool
+    with _hash_process_pool_lock:
+        if reset:
+            _hash_process_pool = None
+        elif _hash_process_pool is None:
+            # 服务已是多线程，fork 会复制监听 socket、mmap 等状态且可能死锁，改由 forkserver/spawn 启动子进程
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _hash_process_pool = ProcessPoolExecutor(
+                max_workers=HASH_WORKERS, mp_context=multiprocessing.get_context(method))
+        return _hash_process_pool
+
+def file_digest(path, algo, st):
+    """返回文件摘要；命中缓存时不读文件，大文件交给进程池计算"""
+    key = file_key(st) + (algo,)
+    digest = HASH_CACHE.get(key)
+    if digest is not None:
+        return digest
+    return SINGLE_FLIGHT.do('hash', key, lambda: _digest_uncached(path, algo, st.st_size, key))
+
+def _digest_uncached(path, algo, size, key):
+    if size <= HASH_INLINE_MAX:
+        digest = hash_file(path, algo)
+    else:
+        try:
+            digest = hash_process_pool().submit(hash_file, path, algo).result()
+        except BrokenProcessPool:
+            hash_process_pool(reset=True)
+            digest = hash_file(path, algo)
+    # 计算期间文件被修改时不缓存
+    if file_key(os.stat(path)) == key[:-1]:
+        HASH_CACHE.put(key, digest)
+    return digest
+
+def walk_files(root):
+    """深度优先遍历目录（跳过隐藏项，不进入符号链接目录），产出 (绝对路径, stat 结果)"""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.is_file():
+                    yield entry.path, entry.stat()
+            except OSError:
+                continue
+        stack.extend(reversed(subdirs))
+
+def workspace_rel_path(full_path):
+    rel_path = os.path.relpath(full_path, WORKSPACE).replace(os.sep, '/')
+    return '' if rel_path == '.' else rel_path
+
+def iter_manifest(root, algo):
+    """递归计算目录下所有文件的摘要，按遍历顺序产出记录；并行计算但限制在途任务数"""
+    window = deque()
+    
+    def result(item):
+        full_path, st, future = item
+        record = {'path': workspace_rel_path(full_path), 'size': st.st_size}
+        try:
+            record['digest'] = future.result()
+        except OSError as e:
+            record['error'] = e.strerror or str(e)
+        return record
+    
+    try:
+        for full_path, st in walk_files(root):
+            window.append((full_path, st, HASH_DISPATCH_POOL.submit(file_digest, full_path, algo, st)))
+            if len(window) >= HASH_WORKERS * 4:
+                yield result(window.popleft())
+        while window:
+            yield result(window.popleft())
+    finally:
+        # 客户端中途断开时取消尚未开始的任务
+        for _, _, future in window:
+            future.cancel()
+
+def partial_digest(path):
+    """文件大小与首尾各 DUPLICATES_PARTIAL_BYTES 字节的摘要，返回 (摘要, stat 结果)
+    
+    文件不超过两个块时首尾块覆盖全文，摘要即可判定内容是否相同。
+    """
+    head, st = read_file_range(path, 0, DUPLICATES_PARTIAL_BYTES)
+    digest = hashlib.blake2b(st.st_size.to_bytes(8, 'little'))
+    digest.update(head)
+    if st.st_size > DUPLICATES_PARTIAL_BYTES:
+        tail_offset = max(DUPLICATES_PARTIAL_BYTES, st.st_size - DUPLICATES_PARTIAL_BYTES)
+        tail, _ = read_file_range(path, tail_offset, DUPLICATES_PARTIAL_BYTES)
+        digest.update(tail)
+    return digest.hexdigest(), st
+
+class DuplicateJob:
+    """后台查找重复文件
+    
+    先按大小分组，再比较首尾块摘要，只对仍然相同的大文件计算完整摘要
+    （复用 /api/hash 的持久缓存），不必读取全部文件。
+    """
+    
+    def __init__(self, root):
+        self.id = uuid.uuid4().hex[:12]
+        self.root = root
+        self.state = 'running'
+        self.phase = 'scan'
+        self.files_scanned = 0
+        self.candidates = 0
+        self.hashed_files = 0
+        self.hashed_bytes = 0
+        self.groups = None
+        self.total_groups = 0
+        self.wasted_bytes = 0
+        self.error = None
+        self.started_at = time.time()
+        self.finished_at = None
+        threading.Thread(target=self._run, name=f'duplicates-{self.id}', daemon=True).start()
+    
+    def _run(self):
+        try:
+            groups = self._find()
+            groups.sort(key=lambda g: g['size'] * (len(g['paths']) - 1), reverse=True)
+            self.total_groups = len(groups)
+            self.wasted_bytes = sum(g['size'] * (len(g['paths']) - 1) for g in groups)
+            self.groups = groups[:DUPLICATES_MAX_GROUPS]
+            self.state = 'done'
+        except Exception as e:
+            self.error = str(e)
+            self.state = 'error'
+        self.finished_at = time.time()
+    
+    def _find(self):
+        # 第一步：按大小分组，只有一个文件的大小只记录路径，不占用额外内存
+        by_size = {}
+        for full_path, st in walk_files(self.root):
+            self.files_scanned += 1
+            if st.st_size < DUPLICATES_MIN_SIZE:
+                continue
+            paths = by_size.get(st.st_size)
+            if paths is None:
+                by_size[st.st_size] = full_path
+            elif isinstance(paths, str):
+                by_size[st.st_size] = [paths, full_path]
+            else:
+                paths.append(full_path)
+        size_groups = [paths for paths in by_size.values() if not isinstance(paths, str)]
+        del by_size
+        self.candidates = sum(len(paths) for paths in size_groups)
+        
+        # 第二步：首尾块摘要；同一 inode（硬链接）只保留一个
+        self.phase = 'partial'
+        partial_groups = []
+        for batch in self._batches(size_groups):
+            results = HASH_DISPATCH_POOL.map(self._safe(partial_digest), [p for paths in batch for p in paths])
+            by_partial = {}
+            seen = set()
+            for full_path, outcome in zip([p for paths in batch for p in paths], results):
+                if outcome is None:
+                    continue
+                digest, st = outcome
+                self.hashed_files += 1
+                self.hashed_bytes += min(st.st_size, 2 * DUPLICATES_PARTIAL_BYTES)
+                if (st.st_dev, st.st_ino) in seen:
+                    continue
+                seen.add((st.st_dev, st.st_ino))
+                by_partial.setdefault(digest, []).append((full_path, st))
+            partial_groups.extend(files for files in by_partial.values() if len(files) > 1)
+        
+        # 第三步：首尾块未覆盖全文的文件计算完整摘要
+        self.phase = 'full'
+        groups = []
+        for files in partial_groups:
+            size = files[0][1].st_size
+            if size <= 2 * DUPLICATES_PARTIAL_BYTES:
+                groups.append(self._group(size, None, [full_path for full_path, _ in files]))
+                continue
+            results = HASH_DISPATCH_POOL.map(
+                self._safe(lambda item: file_digest(item[0], 'blake2b', item[1])), files)
+            by_digest = {}
+            for (full_path, _), digest in zip(files, results):
+                if digest is None:
+                    continue
+                self.hashed_files += 1
+                self.hashed_bytes += size
+                by_digest.setdefault(digest, []).append(full_path)
+            groups.extend(self._group(size, digest, paths) for digest, paths in by_digest.items() if len(paths) > 1)
+        return groups
+    
+    @staticmethod
+    def _batches(size_groups):
+        """把大小分组拼成约 DUPLICATES_BATCH 个文件一批，控制同时在途的任务数"""
+        batch = []
+        count = 0
+        for paths in size_groups:
+            batch.append(paths)
+            count += len(paths)
+            if count >= DUPLICATES_BATCH:
+                yield batch
+                batch = []
+                count = 0
+        if batch:
+            yield batch
+    
+    @staticmethod
+    def _safe(func):
+        # 遍历之后被删除或无权读取的文件直接跳过
+        def wrapper(arg):
+            try:
+                return func(arg)
+            except OSError:
+                return None
+        return wrapper
+    
+    @staticmethod
+    def _group(size, digest, paths):
+        return {'size': size, 'digest': digest, 'paths': sorted(workspace_rel_path(p) for p in paths)}
+    
+    def status(self, with_groups=False):
+        result = {
+            'id': self.id,
+            'path': workspace_rel_path(self.root),
+            'state': self.state,
+            'phase': self.phase,
+            'files_scanned': self.files_scanned,
+            'candidates': self.candidates,
+            'hashed_files': self.hashed_files,
+            'hashed_bytes': self.hashed_bytes,
+            'total_groups': self.total_groups,
+            'wasted_bytes': self.wasted_bytes,
+            'error': self.error,
+            'elapsed': (self.finished_at or time.time()) - self.started_at,
+        }
+        if with_groups:
+            result['groups'] = self.groups
+        return result
+
+DUPLICATE_JOBS = OrderedDict()
+DUPLICATE_JOBS_LOCK = threading.Lock()
+
+def start_duplicate_job(root):
+    """启动重复文件查找；同一目录已有任务在运行时直接返回该任务"""
+    with DUPLICATE_JOBS_LOCK:
+        for job in DUPLICATE_JOBS.values():
+            if job.root == root and job.state == 'running':
+                return job
+        job = DuplicateJob(root)
+        DUPLICATE_JOBS[job.id] = job
+        while len(DUPLICATE_JOBS) > DUPLICATES_MAX_JOBS:
+            DUPLICATE_JOBS.popitem(last=False)
+        return job
+
+class RecentIndex:
+    """工作区内文件按 mtime 降序排列的索引
+    
+    每个目录记录一份 {文件名: (mtime_ns, size)}，目录重新扫描时只把有变化的文件
+    在有序列表中二分删除/插入；查询最近修改的文件只需从列表头部取前 K 项。
+    """
+    
+    def __init__(self):
+        self._order = []    # (-mtime_ns, 目录, 文件名)，升序即 mtime 降序
+        self._dirs = {}
+        self._touched = None
+        self._lock = threading.Lock()
+        self.rescanned_at = None
+    
+    @staticmethod
+    def _apply(order, dir_path, old, new):
+        for name, (mtime_ns, _) in old.items():
+            if new.get(name, (None,))[0] != mtime_ns:
+                i = bisect.bisect_left(order, (-mtime_ns, dir_path, name))
+                if i < len(order) and order[i] == (-mtime_ns, dir_path, name):
+                    del order[i]
+        for name, (mtime_ns, _) in new.items():
+            if old.get(name, (None,))[0] != mtime_ns:
+                bisect.insort(order, (-mtime_ns, dir_path, name))
+    
+    def update_dir(self, dir_path, files):
+        """用目录的最新文件表更新索引"""
+        with self._lock:
+            self._apply(self._order, dir_path, self._dirs.get(dir_path, {}), files)
+            if files:
+                self._dirs[dir_path] = files
+            else:
+                self._dirs.pop(dir_path, None)
+            if self._touched is not None:
+                self._touched.add(dir_path)
+    
+    def update_snapshot(self, dir_path, snapshot):
+        """ListingCache 回调：目录列表页等重新扫描目录时顺带更新索引（跳过隐藏目录和文件）"""
+        rel_path = workspace_rel_path(dir_path)
+        if rel_path.startswith('..') or any(part.startswith('.') for part in rel_path.split('/') if part):
+            return
+        self.update_dir(dir_path, {
+            e.name: (e.mtime_ns, e.size) for e in snapshot.entries
+            if e.kind == 'file' and not e.name.startswith('.')
+        })
+    
+    def rescan(self, root):
+        """全量遍历工作区重建索引
+        
+        原地修改文件不会改变目录 mtime，只能靠定期遍历发现。遍历期间由 update_dir
+        更新过的目录比遍历结果更新，替换时保留这些目录的当前内容。
+        """
+        with self._lock:
+            self._touched = set()
+        dirs = {}
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            files = {}
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if entry.name.startswith('.'):
+                            continue
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif entry.is_file():
+                                st = entry.stat()
+                                files[entry.name] = (st.st_mtime_ns, st.st_size)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+            if files:
+                dirs[os.path.normpath(directory)] = files
+        order = sorted((-mtime_ns, d, name) for d, files in dirs.items() for name, (mtime_ns, _) in files.items())
+        with self._lock:
+            for dir_path in self._touched:
+                live = self._dirs.get(dir_path, {})
+                self._apply(order, dir_path, dirs.get(dir_path, {}), live)
+                if live:
+                    dirs[dir_path] = live
+                else:
+                    dirs.pop(dir_path, None)
+            self._touched = None
+            self._dirs, self._order = dirs, order
+        self.rescanned_at = time.time()
+    
+    def recent(self, limit, since_ns=None):
+        """返回最近修改的至多 limit 个文件 (目录, 文件名, mtime_ns, size)，可限定 mtime 不早于 since_ns"""
+        results = []
+        with self._lock:
+            for neg_mtime_ns, dir_path, name in self._order:
+                if len(results) >= limit or (since_ns is not None and -neg_mtime_ns < since_ns):
+                    break
+                results.append((dir_path, name, -neg_mtime_ns, self._dirs[dir_path][name][1]))
+        return results
+    
+    def __len__(self):
+        return len(self._order)
+
+RECENT_INDEX = RecentIndex()
+LISTING_CACHE.listeners.append(RECENT_INDEX.update_snapshot)
+
+def start_recent_crawler():
+    """后台线程：启动时建立最近修改索引，之后每 RECENT_RESCAN_INTERVAL 秒全量重扫"""
+    def run():
+        while True:
+            try:
+                RECENT_INDEX.rescan(WORKSPACE)
+            except Exception as e:
+                print(f"⚠️ Failed to rescan workspace: {e}", file=sys.stderr)
+            time.sleep(RECENT_RESCAN_INTERVAL)
+    threading.Thread(target=run, name='recent-crawler', daemon=True).start()
+
+def text_codec(encoding):
+    """把嗅探得到的编码名转换为 Python 解码用的编码（去除 BOM）"""
+    return {
+        'utf-8': 'utf-8-sig',
+        'utf-16le': 'utf-16', 'utf-16be': 'utf-16',
+        'utf-32le': 'utf-32', 'utf-32be': 'utf-32',
+    }.get(encoding, encoding)
+
+def stat_result(rel_path, record):
+    return {
+        'path': rel_path,
+        'kind': record.kind,
+        'size': record.size,
+        'mtime': record.mtime_ns / 1e9,
+        'etag': file_etag(record.size, record.mtime_ns) if record.kind == 'file' else None,
+    }
+
+def stat_one(rel_path, full_path):
+    try:
+        st = os.stat(full_path)
+    except FileNotFoundError:
+        return {'path': rel_path, 'error': 'not found'}
+    except OSError as e:
+        return {'path': rel_path, 'error': e.strerror or str(e)}
+    except ValueError as e:
+        # 路径中含 NUL 等非法字符
+        return {'path': rel_path, 'error': str(e)}
+    record = EntryRecord(
+        os.path.basename(full_path), entry_kind(st.st_mode), st.st_size, st.st_mtime_ns, st.st_dev, st.st_ino)
+    return stat_result(rel_path, record)
+
+def stat_paths(rel_paths):
+    """批量查询路径元数据：父目录快照新鲜时直接取缓存，其余在线程池中并行 stat"""
+    targets = [resolve_workspace_path(p) for p in rel_paths]
+    
+    # 并行校验各父目录的快照（每个目录只需一次 stat）
+    parents = list({os.path.dirname(t) for t in targets if t})
+    snapshots = STAT_POOL.map(lambda d: LISTING_CACHE.peek(d, STAT_CACHE_MAX_AGE), parents)
+    indexes = {
+        parent: {e.name: e for e in snapshot.entries}
+        for parent, snapshot in zip(parents, snapshots) if snapshot
+    }
+    
+    results = [None] * len(rel_paths)
+    misses = []
+    for i, (rel_path, full_path) in enumerate(zip(rel_paths, targets)):
+        if full_path is None:
+            results[i] = {'path': rel_path, 'error': 'outside workspace'}
+            continue
+        parent, name = os.path.split(full_path)
+        index = indexes.get(parent)
+        if index is None:
+            misses.append(i)
+        elif name in index:
+            results[i] = stat_result(rel_path, index[name])
+        else:
+            results[i] = {'path': rel_path, 'error': 'not found'}
+    
+    outcomes = STAT_POOL.map(stat_one, [rel_paths[i] for i in misses], [targets[i] for i in misses])
+    for i, outcome in zip(misses, outcomes):
+        results[i] = outcome
+    return results
+
+class StackSampler:
+    """后台线程按固定间隔采样指定线程的调用栈，累计为折叠栈（flamegraph.pl / speedscope 可直接读取）"""
+    
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+    
+    def start(self):
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+    
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.counts.most_common())
+
+ProfileRecord = namedtuple('ProfileRecord', 'id method path reason elapsed_ms started_at pstats collapsed samples')
+
+class ProfileStore:
+    """最近的请求 profile 环形缓冲区，超出 max_keep 时丢弃最旧的"""
+    
+    def __init__(self, max_keep):
+        self._records = deque(maxlen=max_keep)
+        self._next_id = 1
+        self._lock = threading.Lock()
+    
+    def add(self, method, path, reason, elapsed_ms, started_at, profiler, sampler):
+        # 与 pstats.Stats.dump_stats 写出的格式相同
+        profiler.create_stats()
+        pstats_data = marshal.dumps(profiler.stats)
+        with self._lock:
+            record = ProfileRecord(
+                self._next_id, method, path, reason, elapsed_ms, started_at,
+                pstats_data, sampler.collapsed(), sum(sampler.counts.values()))
+            self._next_id += 1
+            self._records.append(record)
+        return record
+    
+    def get(self, profile_id):
+        with self._lock:
+            for record in self._records:
+                if record.id == profile_id:
+                    return record
+        return None
+    
+    def list(self):
+        with self._lock:
+            records = list(self._records)
+        return [{
+            'id': r.id, 'method': r.method, 'path': r.path, 'reason': r.reason,
+            'elapsed_ms': r.elapsed_ms, 'started_at': r.started_at, 'samples': r.samples,
+        } for r in reversed(records)]
+
+PROFILES = ProfileStore(PROFILE_MAX_KEEP)
+# 同一时刻只分析一个请求：cProfile 开销较大，且采样结果需要对应单个请求
+PROFILE_LOCK = threading.Lock()
+
 class WorkspaceBrowserHandler(SimpleHTTPRequestHandler):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, directory=WORKSPACE, **kwargs)
@@ -27,7 +1502,110 @@ class WorkspaceBrowserHandler(SimpleHTTPRequestHandler):
         path = unquote(path, errors='surrogateescape')
         return super().translate_path(path)
     
+    def send_head(self):
+        # 文件响应附带 ETag，前端预览缓存用 If-None-Match 做条件校验
+        self._etag = None
+        path = self.translate_path(self.path)
+        if os.path.isfile(path):
+            try:
+                st = os.stat(path)
+                etag = file_etag(st.st_size, st.st_mtime_ns)
+            except OSError:
+                etag = None
+            if etag:
+                if_none_match = self.headers.get('If-None-Match', '')
+                tags = [t.strip() for t in if_none_match.split(',')]
+                if etag in tags or '*' in tags:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return None
+                self._etag = etag
+        return super().send_head()
+    
+    def guess_type(self, path):
+        # 无法按扩展名识别或本身是文本类型时，根据内容嗅探补充 charset
+        ctype = super().guess_type(path)
+        if ctype == 'application/octet-stream' or ctype.startswith('text/'):
+            try:
+                kind, encoding = classify_file(path, file_key(os.stat(path)))
+            except OSError:
+                return ctype
+            if kind == 'text':
+                base = 'text/plain' if ctype == 'application/octet-stream' else ctype
+                return f'{base}; charset={encoding}'
+        return ctype
+    
+    def end_headers(self):
+        etag = getattr(self, '_etag', None)
+        if etag:
+            self._etag = None
+            self.send_header('ETag', etag)
+        super().end_headers()
+    
     def do_GET(self):
+        self.dispatch_profiled(self.route_get)
+    
+    def do_POST(self):
+        self.dispatch_profiled(self.route_post)
+    
+    def is_admin(self):
+        """配置了 PROFILE_TOKEN 时要求查询参数 token 一致，否则只允许本机访问"""
+        if PROFILE_TOKEN:
+            token = parse_qs(urlparse(self.path).query).get('token', [''])[0]
+            return hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode())
+        try:
+            return ipaddress.ip_address(self.client_address[0]).is_loopback
+        except ValueError:
+            return False
+    
+    def dispatch_profiled(self, dispatch):
+        """按需在 cProfile 与调用栈采样下执行请求分发
+        
+        管理员加 ?profile=1 时强制分析并保留结果；其余请求按 PROFILE_SAMPLE_RATE 随机分析，
+        只保留耗时超过 PROFILE_SLOW_MS 的。已有请求在分析时直接执行，不排队。
+        """
+        requested = 'profile=1' in self.path and \
+            parse_qs(urlparse(self.path).query).get('profile', [''])[0] == '1' and self.is_admin()
+        sampled = requested or (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE)
+        if not sampled or not PROFILE_LOCK.acquire(blocking=False):
+            return dispatch()
+        started_at = time.time()
+        start = time.perf_counter()
+        profiler = cProfile.Profile()
+        sampler = StackSampler(threading.get_ident(), PROFILE_STACK_INTERVAL)
+        sampler.start()
+        SINGLE_FLIGHT.set_bypass(True)
+        try:
+            return profiler.runcall(dispatch)
+        finally:
+            SINGLE_FLIGHT.set_bypass(False)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            sampler.stop()
+            PROFILE_LOCK.release()
+            if requested or elapsed_ms >= PROFILE_SLOW_MS:
+                record = PROFILES.add(
+                    self.command, self.path, 'requested' if requested else 'slow',
+                    elapsed_ms, started_at, profiler, sampler)
+                self.log_message('profile %d saved (%.1f ms)', record.id, elapsed_ms)
+    
+    def route_get(self):
+        route = urlparse(self.path).path
+        if route == '/api/bytes':
+            return self.handle_bytes()
+        if route == '/api/table':
+            return self.handle_table()
+        if route == '/api/hash':
+            return self.handle_hash()
+        if route == '/api/duplicates':
+            return self.handle_duplicates_status()
+        if route == '/api/recent':
+            return self.handle_recent()
+        if route == '/api/metrics':
+            return self.send_json({'single_flight': SINGLE_FLIGHT.metrics()})
+        if route == '/api/profiles' or route.startswith('/api/profiles/'):
+            return self.handle_profiles(route)
+        
         path = self.translate_path(self.path)
         
         # 文件请求直接返回原始内容，前端侧边栏负责渲染预览
@@ -48,88 +1626,309 @@ class WorkspaceBrowserHandler(SimpleHTTPRequestHandler):
         
         return super().do_GET()
     
+    def route_post(self):
+        route = urlparse(self.path).path
+        if route == '/api/stat':
+            return self.handle_stat()
+        if route == '/api/duplicates':
+            return self.handle_duplicates_start()
+        self.send_error(404, 'Not Found')
+    
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def handle_stat(self):
+        """POST /api/stat，请求体 {"paths": [...]}，返回每个路径的 kind/size/mtime/etag"""
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            return self.send_error(400, 'Invalid JSON body')
+        paths = payload.get('paths') if isinstance(payload, dict) else payload
+        if not isinstance(paths, list) or not all(isinstance(p, str) for p in paths):
+            return self.send_error(400, 'Expected {"paths": [...]}')
+        if len(paths) > STAT_MAX_PATHS:
+            return self.send_error(413, f'At most {STAT_MAX_PATHS} paths per request')
+        try:
+            self.send_json({'results': stat_paths(paths)})
+        except Exception as e:
+            self.send_error(500, str(e))
+    
+    def handle_bytes(self):
+        """GET /api/bytes?path=&offset=&length=，读取文件中的一段原始字节（十六进制查看器使用）"""
+        query = parse_qs(urlparse(self.path).query)
+        full_path = resolve_workspace_path(query.get('path', [''])[0])
+        try:
+            offset = int(query.get('offset', ['0'])[0])
+            length = min(int(query.get('length', [str(BYTES_MAX_LENGTH)])[0]), BYTES_MAX_LENGTH)
+        except ValueError:
+            return self.send_error(400, 'Invalid offset or length')
+        # pread 的偏移量是 64 位有符号整数
+        if offset < 0 or length < 0 or offset > 2 ** 63 - 1:
+            return self.send_error(400, 'Invalid offset or length')
+        if full_path is None or not os.path.isfile(full_path):
+            return self.send_error(404, 'File not found')
+        try:
+            data, st = SINGLE_FLIGHT.do(
+                'bytes', (full_path, offset, length), lambda: read_file_range(full_path, offset, length))
+        except OSError as e:
+            return self.send_error(500, str(e))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('X-File-Size', str(st.st_size))
+        self.send_header('ETag', file_etag(st.st_size, st.st_mtime_ns))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def handle_table(self):
+        """GET /api/table?path=&offset=&limit=，分页读取 CSV/TSV/JSONL，附带后台列统计进度（limit=0 仅查询进度）"""
+        query = parse_qs(urlparse(self.path).query)
+        full_path = resolve_workspace_path(query.get('path', [''])[0])
+        try:
+            offset = int(query.get('offset', ['0'])[0])
+            limit = min(int(query.get('limit', ['100'])[0]), TABLE_PAGE_MAX_ROWS)
+        except ValueError:
+            return self.send_error(400, 'Invalid offset or limit')
+        if offset < 0 or limit < 0:
+            return self.send_error(400, 'Invalid offset or limit')
+        if full_path is None or not os.path.isfile(full_path):
+            return self.send_error(404, 'File not found')
+        try:
+            table = open_table(full_path)
+            rows = SINGLE_FLIGHT.do(
+                'rows', (id(table), offset, limit), lambda: table.read_rows(offset, limit)) if limit else []
+        except ValueError as e:
+            return self.send_error(415, str(e))
+        except csv.Error as e:
+            return self.send_error(422, str(e))
+        except OSError as e:
+            return self.send_error(500, str(e))
+        columns = list(table.columns)
+        self.send_json({
+            'format': table.fmt,
+            'columns': columns,
+            'offset': offset,
+            'rows': [[row.get(name) for name in columns] for row in rows],
+            'total_rows': table.total_rows,
+            'indexed_rows': table.indexed_rows,
+            'stats': table.status(),
+        })
+    
+    def handle_hash(self):
+        """GET /api/hash?path=&algo=，文件返回 JSON，目录递归返回 NDJSON 清单"""
+        query = parse_qs(urlparse(self.path).query)
+        algo = query.get('algo', ['sha256'])[0].lower()
+        if algo not in HASH_ALGORITHMS:
+            return self.send_error(400, f'algo must be one of {", ".join(HASH_ALGORITHMS)}')
+        full_path = resolve_workspace_path(query.get('path', [''])[0])
+        if full_path is None or not os.path.exists(full_path):
+            return self.send_error(404, 'File not found')
+        if os.path.isdir(full_path):
+            return self.send_manifest(full_path, algo)
+        try:
+            st = os.stat(full_path)
+            cached = HASH_CACHE.get(file_key(st) + (algo,)) is not None
+            digest = file_digest(full_path, algo, st)
+        except OSError as e:
+            return self.send_error(500, str(e))
+        self.send_json({
+            'path': workspace_rel_path(full_path),
+            'algo': algo,
+            'size': st.st_size,
+            'digest': digest,
+            'cached': cached,
+        })
+    
+    def send_manifest(self, root, algo):
+        # 流式输出：不设 Content-Length，写完后关闭连接
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson; charset=utf-8')
+        self.end_headers()
+        files = errors = total_bytes = 0
+        try:
+            for record in iter_manifest(root, algo):
+                files += 1
+                total_bytes += record['size']
+                errors += 'error' in record
+                self.wfile.write((json.dumps(record) + '\n').encode('utf-8'))
+            summary = {'algo': algo, 'files': files, 'bytes': total_bytes, 'errors': errors}
+            self.wfile.write((json.dumps({'summary': summary}) + '\n').encode('utf-8'))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+    
+    def handle_duplicates_start(self):
+        """POST /api/duplicates?path=，在后台查找目录下的重复文件，返回任务状态"""
+        query = parse_qs(urlparse(self.path).query)
+        root = resolve_workspace_path(query.get('path', [''])[0])
+        if root is None or not os.path.isdir(root):
+            return self.send_error(404, 'Directory not found')
+        self.send_json(start_duplicate_job(root).status(), status=202)
+    
+    def handle_duplicates_status(self):
+        """GET /api/duplicates?id=，返回任务进度及（完成后的）重复分组；不带 id 时列出所有任务"""
+        query = parse_qs(urlparse(self.path).query)
+        job_id = query.get('id', [''])[0]
+        with DUPLICATE_JOBS_LOCK:
+            jobs = list(DUPLICATE_JOBS.values())
+        if not job_id:
+            return self.send_json({'jobs': [job.status() for job in jobs]})
+        for job in jobs:
+            if job.id == job_id:
+                return self.send_json(job.status(with_groups=True))
+        self.send_error(404, 'Job not found')
+    
+    def handle_profiles(self, route):
+        """GET /api/profiles 列出保留的 profile；/api/profiles/<id>.pstats 或 .collapsed 下载单个 profile"""
+        if not self.is_admin():
+            return self.send_error(403, 'Forbidden')
+        if route == '/api/profiles':
+            return self.send_json({
+                'sample_rate': PROFILE_SAMPLE_RATE,
+                'slow_ms': PROFILE_SLOW_MS,
+                'profiles': PROFILES.list(),
+            })
+        name = route[len('/api/profiles/'):]
+        profile_id, _, fmt = name.partition('.')
+        record = PROFILES.get(int(profile_id)) if profile_id.isdigit() else None
+        if record is None or fmt not in ('pstats', 'collapsed'):
+            return self.send_error(404, 'Profile not found')
+        if fmt == 'pstats':
+            body, ctype = record.pstats, 'application/octet-stream'
+        else:
+            body, ctype = record.collapsed.encode('utf-8'), 'text/plain; charset=utf-8'
+        self.send_response(200)
+        self.send_header('Content-Type', ctype)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Content-Disposition', f'attachment; filename="profile-{record.id}.{fmt}"')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def handle_recent(self):
+        """GET /api/recent?limit=&since=，返回整个工作区最近修改的文件（since 为 Unix 时间戳，秒）"""
+        query = parse_qs(urlparse(self.path).query)
+        try:
+            limit = int(query.get('limit', [RECENT_DEFAULT_LIMIT])[0])
+            since = query.get('since', [''])[0]
+            since_ns = int(float(since) * 1e9) if since else None
+        except (ValueError, OverflowError):
+            return self.send_error(400, 'Invalid limit or since')
+        if limit < 0:
+            return self.send_error(400, 'Invalid limit or since')
+        files = RECENT_INDEX.recent(min(limit, RECENT_MAX_LIMIT), since_ns)
+        self.send_json({
+            'files': [
+                {'path': workspace_rel_path(os.path.join(d, name)), 'size': size, 'mtime': mtime_ns / 1e9}
+                for d, name, mtime_ns, size in files
+            ],
+            'indexed_files': len(RECENT_INDEX),
+            'rescanned_at': RECENT_INDEX.rescanned_at,
+        })
+    
     def list_directory(self, path):
         try:
-            # 前端JS排序，后端默认按名称排序
-            entries = list(Path(path).iterdir())
-            # 过滤隐藏文件
-            entries = [e for e in entries if not e.name.startswith('.')]
-            
-            # 默认按名称排序（目录在前）
-            entries.sort(key=lambda x: (not x.is_dir(), x.name.lower()))
-            
-            # 相对路径
-            rel_path = os.path.relpath(path, WORKSPACE)
-            if rel_path == '.':
-                breadcrumb = '/'
-                title = 'Workspace'
+            # 同一目录的并发请求只扫描、渲染一次，共享渲染结果
+            body = SINGLE_FLIGHT.do('listing', os.path.normpath(path), lambda: self.render_directory(path))
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except Exception as e:
+            self.send_error(500, str(e))
+    
+    def render_directory(self, path):
+        """渲染目录列表页，返回 UTF-8 编码的 HTML"""
+        # 前端JS排序，后端快照已按名称排序（目录在前）
+        snapshot = LISTING_CACHE.get(path)
+        snapshot = LISTING_CACHE.refresh_files(path, snapshot)
+        # 过滤隐藏文件
+        entries = [e for e in snapshot.entries if not e.name.startswith('.')]
+        # 内容分类（文本/二进制及编码），供前端选择预览方式
+        files = [e for e in entries if e.kind == 'file']
+        classes = classify_entries(path, files[:CLASSIFY_LISTING_MAX])
+        
+        # 相对路径
+        rel_path = os.path.relpath(path, WORKSPACE)
+        if rel_path == '.':
+            breadcrumb = '/'
+            title = 'Workspace'
+        else:
+            breadcrumb = '/' + rel_path.replace(os.sep, '/') + '/'
+            title = os.path.basename(path.rstrip('/'))
+        
+        # 面包屑
+        breadcrumb_html = ''
+        if rel_path != '.':
+            parts = rel_path.split('/')
+            cumulative = ''
+            for part in parts:
+                cumulative += '/' + part
+                breadcrumb_html += f' / <a href="{cumulative}/">{part}</a>'
+        
+        # 文件列表：逐项收集后一次拼接（+= 在性能分析下会退化为平方复杂度）
+        file_items = []
+        
+        # 父目录
+        if path != WORKSPACE:
+            parent = os.path.dirname(path)
+            rel_parent = os.path.relpath(parent, WORKSPACE)
+            parent_url = '/' + rel_parent.replace(os.sep, '/') + '/' if rel_parent != '.' else '/'
+            file_items.append(f'''
+            <li class="file-item parent-item" data-parent-url="{parent_url}" tabindex="0">
+                <span class="file-icon dir-icon">📂</span>
+                <span class="file-name">..</span>
+                <span class="file-type">Parent</span>
+                <span class="file-size">-</span>
+                <span class="file-modified">-</span>
+            </li>
+''')
+        
+        for entry in entries:
+            name = entry.name
+            url = '/' + os.path.relpath(os.path.join(path, name), WORKSPACE).replace(os.sep, '/')
+            if entry.kind == 'dir':
+                url += '/'
+                icon = '📂'
+                icon_class = 'dir-icon'
+                ftype = 'Directory'
             else:
-                breadcrumb = '/' + rel_path.replace(os.sep, '/') + '/'
-                title = os.path.basename(path.rstrip('/'))
-            
-            # 面包屑
-            breadcrumb_html = ''
-            if rel_path != '.':
-                parts = rel_path.split('/')
-                cumulative = ''
-                for part in parts:
-                    cumulative += '/' + part
-                    breadcrumb_html += f' / <a href="{cumulative}/">{part}</a>'
+                icon, icon_class = self.get_file_icon(name)
+                ftype = self.get_file_type(name)
             
-            # 文件列表
-            files_html = ''
-            
-            # 父目录
-            if path != WORKSPACE:
-                parent = os.path.dirname(path)
-                rel_parent = os.path.relpath(parent, WORKSPACE)
-                parent_url = '/' + rel_parent.replace(os.sep, '/') + '/' if rel_parent != '.' else '/'
-                files_html += f'''
-                <li class="file-item parent-item" data-parent-url="{parent_url}">
-                    <span class="file-icon dir-icon">📂</span>
-                    <span class="file-name">..</span>
-                    <span class="file-type">Parent</span>
-                    <span class="file-size">-</span>
-                    <span class="file-modified">-</span>
-                </li>
-'''
+            size = self.format_size(entry.size) if entry.kind == 'file' else '-'
+            mtime = datetime.fromtimestamp(entry.mtime_ns / 1e9).strftime('%Y-%m-%d %H:%M')
+            kind, encoding = classes.get(name, ('', None))
             
-            for entry in entries:
-                name = entry.name
-                url = '/' + os.path.relpath(entry, WORKSPACE).replace(os.sep, '/')
-                if entry.is_dir():
-                    url += '/'
-                    icon = '📂'
-                    icon_class = 'dir-icon'
-                    ftype = 'Directory'
-                else:
-                    icon, icon_class = self.get_file_icon(name)
-                    ftype = self.get_file_type(name)
-                
-                size = self.format_size(entry.stat().st_size) if entry.is_file() else '-'
-                mtime = datetime.fromtimestamp(entry.stat().st_mtime).strftime('%Y-%m-%d %H:%M')
-                
-                files_html += f'''
-                <li class="file-item" data-url="{url}">
-                    <span class="file-icon {icon_class}">{icon}</span>
-                    <span class="file-name">{name}</span>
-                    <span class="file-type">{ftype}</span>
-                    <span class="file-size">{size}</span>
-                    <span class="file-modified">{mtime}</span>
-                </li>
-'''
-            
-            # 排序链接 - 前端JS排序
-            sort_links = '''
-            <div class="sort-options">
-                <span class="sort-label">排序:</span>
-                <button class="sort-btn active" data-field="name">名称</button>
-                <button class="sort-btn" data-field="time">时间</button>
-                <button class="sort-btn" data-field="type">类型</button>
-            </div>
+            file_items.append(f'''
+            <li class="file-item" data-url="{url}" data-size="{entry.size}" data-kind="{kind}" data-encoding="{encoding or ''}" tabindex="0">
+                <span class="file-icon {icon_class}">{icon}</span>
+                <span class="file-name">{name}</span>
+                <span class="file-type">{ftype}</span>
+                <span class="file-size">{size}</span>
+                <span class="file-modified">{mtime}</span>
+            </li>
+''')
+        files_html = ''.join(file_items)
+        
+        # 排序链接 - 前端JS排序
+        sort_links = '''
+        <div class="sort-options">
+            <span class="sort-label">排序:</span>
+            <button class="sort-btn active" data-field="name">名称</button>
+            <button class="sort-btn" data-field="time">时间</button>
+            <button class="sort-btn" data-field="type">类型</button>
+        </div>
+        <button id="find-duplicates" class="toolbar-btn" type="button" onclick="findDuplicates()">重复文件</button>
 '''
-            
-            html = f'''<!DOCTYPE html>
+        
+        html = f'''<!DOCTYPE html>
 <html>
 <head>
     <meta charset="utf-8">
@@ -205,7 +2004,7 @@ class WorkspaceBrowserHandler(SimpleHTTPRequestHandler):
             font-size: 12px;
             margin-right: 5px;
         }}
-        .sort-btn {{
+        .sort-btn, .toolbar-btn {{
             color: #888;
             font-size: 12px;
             padding: 4px 10px;
@@ -214,7 +2013,7 @@ class WorkspaceBrowserHandler(SimpleHTTPRequestHandler):
             border: none;
             cursor: pointer;
         }}
-        .sort-btn:hover {{ color: #eee; background: #1f3460; }}
+        .sort-btn:hover, .toolbar-btn:hover {{ color: #eee; background: #1f3460; }}
         .sort-btn.active {{ color: #00d9ff; background: #0f3460; }}
         
         /* 主内容 */
@@ -251,6 +2050,7 @@ class WorkspaceBrowserHandler(SimpleHTTPRequestHandler):
             transition: all 0.2s;
         }}
         .file-item:hover {{ background: #1f3460; }}
+        .file-item:focus {{ outline: none; background: #1f3460; }}
         .file-item.active {{ background: #0f3460; border-left: 3px solid #00d9ff; }}
         .file-icon {{ font-size: 20px; margin-right: 12px; width: 28px; text-align: center; }}
         .file-name {{ flex: 1; font-size: 14px; overflow: hidden; text-overflow: ellipsis; white-space: nowrap; }}
@@ -292,6 +2092,67 @@ class WorkspaceBrowserHandler(SimpleHTTPRequestHandler):
             cursor: pointer;
         }}
         .md-preview-btn:hover {{ background: #2c4b86; color: #eaf9ff; }}
+        a.md-preview-btn {{ text-decoration: none; }}
+        .hex-view {{
+            display: none;
+            position: relative;
+            height: 100%;
+            overflow: auto;
+            background: #1f2230;
+        }}
+        .table-view {{
+            display: none;
+            flex-direction: column;
+            height: 100%;
+            background: #1f2230;
+        }}
+        .table-toolbar {{
+            display: flex;
+            align-items: center;
+            gap: 10px;
+            padding: 6px 16px;
+            border-bottom: 1px solid #3b3f51;
+            color: #b9bfd5;
+            font-size: 12px;
+        }}
+        .table-toolbar input {{
+            width: 90px;
+            background: #16213e;
+            border: 1px solid #0f3460;
+            color: #eee;
+            padding: 3px 6px;
+            border-radius: 4px;
+            font-size: 12px;
+        }}
+        .table-toolbar button:disabled {{ opacity: 0.4; cursor: default; }}
+        .table-stats-state {{ color: #ffb86c; }}
+        .table-scroll {{ flex: 1; overflow: auto; }}
+        .table-grid {{ border-collapse: collapse; font-size: 12px; color: #f8f8f2; }}
+        .table-grid thead {{ position: sticky; top: 0; background: #16213e; }}
+        .table-grid th, .table-grid td {{
+            border: 1px solid #3b3f51;
+            padding: 4px 8px;
+            max-width: 320px;
+            overflow: hidden;
+            text-overflow: ellipsis;
+            white-space: nowrap;
+            text-align: left;
+        }}
+        .table-grid th {{ color: #8be9fd; }}
+        .table-grid .table-stats th {{ color: #6272a4; font-weight: normal; font-size: 11px; }}
+        .table-grid .row-num {{ color: #6272a4; text-align: right; }}
+        .hex-rows {{
+            position: absolute;
+            top: 0;
+            left: 0;
+            right: 0;
+            padding: 0 16px;
+            font-family: Menlo, Consolas, 'DejaVu Sans Mono', monospace;
+            font-size: 13px;
+            line-height: 18px;
+            color: #f8f8f2;
+            white-space: pre;
+        }}
         .preview-close {{
             color: #666;
             cursor: pointer;
@@ -337,6 +2198,11 @@ class WorkspaceBrowserHandler(SimpleHTTPRequestHandler):
             margin: 18px 0 10px;
         }}
         .markdown-preview p, .markdown-preview ul, .markdown-preview ol {{ margin: 10px 0; }}
+        .dup-group {{ margin: 12px 0; padding: 8px 12px; background: #16213e; border-radius: 4px; }}
+        .dup-group-header {{ color: #8be9fd; font-size: 13px; }}
+        .dup-group ul {{ margin: 4px 0 0 18px; font-size: 12px; }}
+        .dup-group a {{ color: #e7e7ec; text-decoration: none; }}
+        .dup-group a:hover {{ color: #00d9ff; text-decoration: underline; }}
         .markdown-preview a {{ color: #50fa7b; }}
         .markdown-preview code {{
             background: #1f2230;
@@ -399,6 +2265,7 @@ class WorkspaceBrowserHandler(SimpleHTTPRequestHandler):
                     <h2 id="preview-title">Preview</h2>
                     <div class="preview-actions">
                         <button id="md-preview-toggle" class="md-preview-btn" type="button">预览</button>
+                        <a id="preview-download" class="md-preview-btn" download>下载</a>
                         <span class="preview-close" onclick="closePreview()">✕</span>
                     </div>
                 </div>
@@ -410,6 +2277,23 @@ class WorkspaceBrowserHandler(SimpleHTTPRequestHandler):
                         <img id="image-preview" class="image-preview" alt="Image preview">
                     </div>
                     <div id="markdown-preview" class="markdown-preview"></div>
+                    <div id="duplicates-view" class="markdown-preview"></div>
+                    <div id="table-view" class="table-view">
+                        <div class="table-toolbar">
+                            <button id="table-prev" class="md-preview-btn" type="button" style="display:inline-block">‹</button>
+                            <span id="table-info"></span>
+                            <button id="table-next" class="md-preview-btn" type="button" style="display:inline-block">›</button>
+                            <input id="table-jump" type="number" min="1" placeholder="跳转到行">
+                            <span id="table-stats-state" class="table-stats-state"></span>
+                        </div>
+                        <div class="table-scroll">
+                            <table id="table-grid" class="table-grid"></table>
+                        </div>
+                    </div>
+                    <div id="hex-view" class="hex-view">
+                        <div id="hex-spacer"></div>
+                        <div id="hex-rows" class="hex-rows"></div>
+                    </div>
                     <textarea id="code" style="display:none;"></textarea>
                 </div>
             </div>
@@ -424,6 +2308,7 @@ class WorkspaceBrowserHandler(SimpleHTTPRequestHandler):
         let markdownPreviewMode = false;
         
         const mdToggleBtn = document.getElementById('md-preview-toggle');
+        const downloadLink = document.getElementById('preview-download');
         const markdownPreviewEl = document.getElementById('markdown-preview');
         
         function getCodeMirrorWrapper() {{
@@ -439,7 +2324,8 @@ class WorkspaceBrowserHandler(SimpleHTTPRequestHandler):
         function setSourceViewVisible(visible) {{
             const code = document.getElementById('code');
             const wrapper = getCodeMirrorWrapper();
-            code.style.display = visible ? 'block' : 'none';
+            // 编辑器创建后 textarea 由 CodeMirror 接管，保持隐藏
+            code.style.display = visible && !editor ? 'block' : 'none';
             if (wrapper) {{
                 wrapper.style.display = visible ? 'block' : 'none';
             }}
@@ -478,25 +2364,306 @@ class WorkspaceBrowserHandler(SimpleHTTPRequestHandler):
         
         function resetPreviewState() {{
             document.getElementById('preview-empty').style.display = 'none';
-            document.getElementById('code').style.display = 'none';
             document.getElementById('image-preview-wrap').style.display = 'none';
             markdownPreviewEl.style.display = 'none';
             markdownPreviewEl.innerHTML = '';
             currentFileExt = '';
             markdownPreviewMode = false;
             updateMdPreviewButton();
+            // 编辑器实例只隐藏不销毁，切换文件时通过 swapDoc 复用
+            setSourceViewVisible(false);
+            closeHexView();
+            closeTableView();
+            closeDuplicatesView();
+            downloadLink.style.display = 'none';
             
             if (currentImageUrl) {{
                 URL.revokeObjectURL(currentImageUrl);
                 currentImageUrl = null;
             }}
+        }}
+        
+        function showEditorDoc(doc) {{
+            if (!editor) {{
+                editor = CodeMirror.fromTextArea(document.getElementById('code'), {{
+                    mode: 'text',
+                    theme: 'dracula',
+                    lineNumbers: true,
+                    readOnly: true
+                }});
+            }}
+            if (editor.getDoc() !== doc) {{
+                editor.swapDoc(doc);
+            }}
+            setSourceViewVisible(true);
+        }}
+        
+        // 表格预览：服务端流式分页读取 CSV/TSV/JSONL，后台列统计完成后显示列摘要
+        const tableExts = ['csv', 'tsv', 'tab', 'jsonl', 'ndjson'];
+        const imageExts = ['png', 'jpg', 'jpeg', 'gif', 'webp', 'bmp', 'ico', 'svg', 'avif'];
+        const TABLE_PAGE_ROWS = 100;
+        const TABLE_STATS_POLL_MS = 1000;
+        const tableViewEl = document.getElementById('table-view');
+        let tableState = null;
+        
+        function openTableView(url) {{
+            closeTableView();
+            tableState = {{ url, data: null, pageController: null, pollController: null, pollTimer: null }};
+            tableViewEl.style.display = 'flex';
+            loadTablePage(0);
+        }}
+        
+        function closeTableView() {{
+            if (!tableState) return;
+            if (tableState.pageController) tableState.pageController.abort();
+            if (tableState.pollController) tableState.pollController.abort();
+            clearTimeout(tableState.pollTimer);
+            tableState = null;
+            tableViewEl.style.display = 'none';
+            document.getElementById('table-grid').innerHTML = '';
+        }}
+        
+        async function fetchTable(url, offset, limit, signal) {{
+            const response = await fetch(
+                '/api/table?path=' + encodeURIComponent(url) + '&offset=' + offset + '&limit=' + limit,
+                {{ signal }}
+            );
+            if (!response.ok) throw new Error('HTTP ' + response.status);
+            return response.json();
+        }}
+        
+        async function loadTablePage(offset) {{
+            const state = tableState;
+            if (!state) return;
+            if (state.pageController) state.pageController.abort();
+            const controller = new AbortController();
+            state.pageController = controller;
+            document.getElementById('table-info').textContent = '加载中…';
+            try {{
+                const data = await fetchTable(state.url, offset, TABLE_PAGE_ROWS, controller.signal);
+                if (state !== tableState) return;
+                state.data = data;
+                renderTable();
+                scheduleTableStatsPoll(state);
+            }} catch (err) {{
+                if (err.name === 'AbortError' || state !== tableState) return;
+                document.getElementById('table-info').textContent = 'Error: ' + err.message;
+            }}
+        }}
+        
+        // 后台统计未完成时定期查询进度（limit=0 只返回统计信息）
+        function scheduleTableStatsPoll(state) {{
+            clearTimeout(state.pollTimer);
+            if (state.data.stats.state !== 'running') return;
+            state.pollTimer = setTimeout(async () => {{
+                const controller = new AbortController();
+                state.pollController = controller;
+                try {{
+                    const data = await fetchTable(state.url, state.data.offset, 0, controller.signal);
+                    if (state !== tableState) return;
+                    state.data.stats = data.stats;
+                    state.data.total_rows = data.total_rows;
+                    state.data.indexed_rows = data.indexed_rows;
+                    renderTable();
+                    scheduleTableStatsPoll(state);
+                }} catch (err) {{
+                    // 进度查询失败时不再重试，翻页会重新触发
+                }}
+            }}, TABLE_STATS_POLL_MS);
+        }}
+        
+        function formatTableValue(value) {{
+            if (value === null || value === undefined) return '';
+            return typeof value === 'object' ? JSON.stringify(value) : String(value);
+        }}
+        
+        function renderTable() {{
+            const data = tableState.data;
+            const stats = data.stats;
+            const columnStats = {{}};
+            (stats.columns || []).forEach(column => {{ columnStats[column.name] = column; }});
+            
+            let html = '<thead><tr><th>#</th>' +
+                data.columns.map(name => '<th>' + escapeHtml(String(name)) + '</th>').join('') + '</tr>';
+            if (stats.columns) {{
+                html += '<tr class="table-stats"><th></th>' + data.columns.map(name => {{
+                    const column = columnStats[name];
+                    if (!column) return '<th></th>';
+                    let summary = column.type + ' · null ' + column.nulls;
+                    if (column.min !== null) {{
+                        summary += ' · ' + formatTableValue(column.min) + ' … ' + formatTableValue(column.max);
+                    }}
+                    return '<th title="' + escapeHtml(summary) + '">' + escapeHtml(summary) + '</th>';
+                }}).join('') + '</tr>';
+            }}
+            html += '</thead><tbody>';
+            data.rows.forEach((row, i) => {{
+                html += '<tr><td class="row-num">' + (data.offset + i + 1) + '</td>' +
+                    row.map(value => '<td>' + escapeHtml(formatTableValue(value)) + '</td>').join('') + '</tr>';
+            }});
+            document.getElementById('table-grid').innerHTML = html + '</tbody>';
+            
+            const end = data.offset + data.rows.length;
+            const total = data.total_rows !== null ? data.total_rows : '≥' + data.indexed_rows;
+            document.getElementById('table-info').textContent =
+                (data.rows.length ? (data.offset + 1) + '–' + end : '0') + ' / ' + total + ' 行';
+            document.getElementById('table-prev').disabled = data.offset === 0;
+            document.getElementById('table-next').disabled =
+                data.rows.length < TABLE_PAGE_ROWS || (data.total_rows !== null && end >= data.total_rows);
+            
+            let stateText = '';
+            if (stats.state === 'running') {{
+                stateText = '列统计中 ' + Math.floor(stats.bytes_scanned / Math.max(stats.size, 1) * 100) + '%';
+            }} else if (stats.state === 'error') {{
+                stateText = '列统计失败';
+            }}
+            document.getElementById('table-stats-state').textContent = stateText;
+        }}
+        
+        document.getElementById('table-prev').addEventListener('click', () => {{
+            if (tableState && tableState.data) loadTablePage(Math.max(0, tableState.data.offset - TABLE_PAGE_ROWS));
+        }});
+        document.getElementById('table-next').addEventListener('click', () => {{
+            if (tableState && tableState.data) loadTablePage(tableState.data.offset + TABLE_PAGE_ROWS);
+        }});
+        document.getElementById('table-jump').addEventListener('change', (e) => {{
+            const row = parseInt(e.target.value, 10);
+            if (tableState && row > 0) loadTablePage(row - 1);
+        }});
+        
+        // 十六进制查看器：虚拟滚动覆盖整个文件，只按页拉取可见区域的字节
+        const HEX_ROW_BYTES = 16;
+        const HEX_ROW_HEIGHT = 18;
+        const HEX_PAGE_BYTES = 4096;
+        const HEX_MAX_PAGES = 256;
+        // 浏览器对元素高度有上限，文件过大时按比例把滚动位置映射到行号
+        const HEX_MAX_SCROLL_HEIGHT = 8000000;
+        const hexViewEl = document.getElementById('hex-view');
+        const hexRowsEl = document.getElementById('hex-rows');
+        let hexState = null;
+        
+        function openHexView(url, size) {{
+            closeHexView();
+            hexState = {{
+                url,
+                size,
+                totalRows: Math.ceil(size / HEX_ROW_BYTES),
+                pages: new Map(),
+                pending: new Map()
+            }};
+            document.getElementById('hex-spacer').style.height =
+                Math.min(hexState.totalRows * HEX_ROW_HEIGHT, HEX_MAX_SCROLL_HEIGHT) + 'px';
+            hexViewEl.style.display = 'block';
+            hexViewEl.scrollTop = 0;
+            renderHexView();
+        }}
+        
+        function closeHexView() {{
+            if (!hexState) return;
+            hexState.pending.forEach(controller => controller.abort());
+            hexState = null;
+            hexViewEl.style.display = 'none';
+            hexRowsEl.textContent = '';
+        }}
+        
+        function hexFirstRow(visibleRows) {{
+            const maxFirst = Math.max(0, hexState.totalRows - visibleRows);
+            const maxScroll = hexViewEl.scrollHeight - hexViewEl.clientHeight;
+            if (hexState.totalRows * HEX_ROW_HEIGHT <= HEX_MAX_SCROLL_HEIGHT || maxScroll <= 0) {{
+                return Math.min(Math.floor(hexViewEl.scrollTop / HEX_ROW_HEIGHT), maxFirst);
+            }}
+            return Math.round(hexViewEl.scrollTop / maxScroll * maxFirst);
+        }}
+        
+        function formatHexRow(offset, bytes) {{
+            const address = offset.toString(16).padStart(10, '0');
+            if (!bytes) return address + '  …';
+            if (!bytes.length) return address + '  <read error>';
+            let hex = '';
+            let ascii = '';
+            for (let i = 0; i < HEX_ROW_BYTES; i++) {{
+                if (i < bytes.length) {{
+                    hex += bytes[i].toString(16).padStart(2, '0') + ' ';
+                    ascii += bytes[i] >= 0x20 && bytes[i] < 0x7f ? String.fromCharCode(bytes[i]) : '.';
+                }} else {{
+                    hex += '   ';
+                }}
+                if (i === 7) hex += ' ';
+            }}
+            return address + '  ' + hex + ' ' + ascii;
+        }}
+        
+        function renderHexView() {{
+            const state = hexState;
+            if (!state) return;
+            if (!state.totalRows) {{
+                hexRowsEl.textContent = '(empty file)';
+                return;
+            }}
+            const visibleRows = Math.ceil(hexViewEl.clientHeight / HEX_ROW_HEIGHT) + 1;
+            const first = hexFirstRow(visibleRows);
+            const last = Math.min(state.totalRows, first + visibleRows);
+            const firstPage = Math.floor(first * HEX_ROW_BYTES / HEX_PAGE_BYTES);
+            const lastPage = Math.floor((last * HEX_ROW_BYTES - 1) / HEX_PAGE_BYTES);
+            
+            // 滚出可见区域的页不再需要，取消其请求
+            state.pending.forEach((controller, page) => {{
+                if (page < firstPage || page > lastPage) {{
+                    controller.abort();
+                    state.pending.delete(page);
+                }}
+            }});
             
-            if (editor) {{
-                editor.toTextArea();
-                editor = null;
+            const lines = [];
+            for (let row = first; row < last; row++) {{
+                const offset = row * HEX_ROW_BYTES;
+                const page = Math.floor(offset / HEX_PAGE_BYTES);
+                const data = state.pages.get(page);
+                if (!data) loadHexPage(state, page);
+                const start = offset - page * HEX_PAGE_BYTES;
+                lines.push(formatHexRow(offset, data && (data.length ? data.subarray(start, start + HEX_ROW_BYTES) : data)));
             }}
+            hexRowsEl.style.top = hexViewEl.scrollTop + 'px';
+            hexRowsEl.textContent = lines.join('\\n');
         }}
         
+        async function loadHexPage(state, page) {{
+            if (state.pending.has(page)) return;
+            const controller = new AbortController();
+            state.pending.set(page, controller);
+            try {{
+                const response = await fetch(
+                    '/api/bytes?path=' + encodeURIComponent(state.url) +
+                    '&offset=' + page * HEX_PAGE_BYTES + '&length=' + HEX_PAGE_BYTES,
+                    {{ signal: controller.signal }}
+                );
+                if (!response.ok) throw new Error('HTTP ' + response.status);
+                state.pages.set(page, new Uint8Array(await response.arrayBuffer()));
+            }} catch (err) {{
+                if (err.name === 'AbortError') return;
+                // 读取失败记为空页，避免反复重试
+                state.pages.set(page, new Uint8Array(0));
+            }} finally {{
+                if (state.pending.get(page) === controller) state.pending.delete(page);
+            }}
+            // 只保留最近拉取的若干页
+            if (state.pages.size > HEX_MAX_PAGES) {{
+                state.pages.delete(state.pages.keys().next().value);
+            }}
+            if (state === hexState) renderHexView();
+        }}
+        
+        let hexRenderQueued = false;
+        hexViewEl.addEventListener('scroll', () => {{
+            if (hexRenderQueued) return;
+            hexRenderQueued = true;
+            requestAnimationFrame(() => {{
+                hexRenderQueued = false;
+                renderHexView();
+            }});
+        }});
+        window.addEventListener('resize', renderHexView);
+        
         function navigateTo(url) {{
             if (!url) return;
             window.location.href = url;
@@ -523,8 +2690,219 @@ class WorkspaceBrowserHandler(SimpleHTTPRequestHandler):
             updateMdPreviewButton();
         }});
         
+        const textExts = ['md', 'txt', 'py', 'js', 'ts', 'json', 'html', 'css', 'sh', 'yaml', 'yml', 'xml', 'log', 'cfg', 'conf', 'ini'];
+        const langMap = {{
+            'py': 'python', 'js': 'javascript', 'ts': 'typescript',
+            'json': 'json', 'html': 'htmlmixed', 'css': 'css',
+            'md': 'markdown', 'xml': 'xml', 'yaml': 'yaml',
+            'yml': 'yaml', 'sh': 'shell', 'ini': 'properties',
+            'cfg': 'properties', 'conf': 'properties',
+            'log': 'text', 'txt': 'text'
+        }};
+        
+        // 预览缓存：按最近使用淘汰（LRU），再次打开时用 ETag 条件请求校验
+        const PREVIEW_CACHE_MAX_ENTRIES = 64;
+        const PREVIEW_CACHE_MAX_BYTES = 32 * 1024 * 1024;
+        const PREFETCH_MAX_BYTES = 2 * 1024 * 1024;
+        const PREFETCH_DELAY_MS = 120;
+        const previewCache = new Map();
+        const inflightPreviews = new Map();
+        let previewCacheBytes = 0;
+        let previewToken = 0;
+        let prefetchTimer = null;
+        let prefetchUrl = null;
+        
+        function getFileExt(url) {{
+            return url.split('/').pop().split('.').pop().toLowerCase();
+        }}
+        
+        function cacheGet(url) {{
+            const entry = previewCache.get(url);
+            if (entry) {{
+                // Map 按插入顺序迭代，重新插入即标记为最近使用
+                previewCache.delete(url);
+                previewCache.set(url, entry);
+            }}
+            return entry;
+        }}
+        
+        function cachePut(url, entry) {{
+            const old = previewCache.get(url);
+            if (old) {{
+                previewCache.delete(url);
+                previewCacheBytes -= old.bytes;
+            }}
+            if (entry.bytes > PREVIEW_CACHE_MAX_BYTES) return;
+            previewCache.set(url, entry);
+            previewCacheBytes += entry.bytes;
+            for (const [key, value] of previewCache) {{
+                if (previewCache.size <= PREVIEW_CACHE_MAX_ENTRIES && previewCacheBytes <= PREVIEW_CACHE_MAX_BYTES) break;
+                previewCache.delete(key);
+                previewCacheBytes -= value.bytes;
+            }}
+        }}
+        
+        function decodeText(buffer, encoding) {{
+            try {{
+                return new TextDecoder(encoding || 'utf-8').decode(buffer);
+            }} catch (err) {{
+                // 浏览器不支持的编码（如 UTF-32）退回 UTF-8
+                return new TextDecoder('utf-8').decode(buffer);
+            }}
+        }}
+        
+        // meta 为列表项上服务端嗅探的内容分类：kind 为 text / binary，encoding 为文本编码
+        async function fetchPreviewEntry(url, signal, meta) {{
+            const cached = previewCache.get(url);
+            const headers = {{}};
+            if (cached && cached.etag) {{
+                headers['If-None-Match'] = cached.etag;
+            }}
+            // 已知是二进制文件时只取响应头（大小/ETag），内容由十六进制查看器按需分页读取；
+            // 图片头部含 NUL 也会被嗅探为二进制，仍需下载正文
+            const ext = getFileExt(url);
+            // 表格文件由服务端分页读取，不下载全文
+            const isTable = tableExts.includes(ext) && meta.kind !== 'binary';
+            const method = (meta.kind === 'binary' && !imageExts.includes(ext)) || isTable ? 'HEAD' : 'GET';
+            const response = await fetch(url, {{ method, signal, headers }});
+            if (response.status === 304 && cached) return cached;
+            if (!response.ok) {{
+                throw new Error('HTTP ' + response.status);
+            }}
+            
+            const contentType = (response.headers.get('content-type') || '').toLowerCase();
+            const charset = (contentType.match(/charset=([^;]+)/) || [])[1];
+            // 没有嗅探结果时（超出列表分类上限）按扩展名和响应类型判断
+            const isText = meta.kind ? meta.kind === 'text' : (
+                textExts.includes(ext) ||
+                contentType.startsWith('text/') ||
+                contentType.includes('json') ||
+                contentType.includes('xml')
+            );
+            const entry = {{
+                etag: response.headers.get('etag'),
+                kind: 'other',
+                size: Number(response.headers.get('content-length') || 0),
+                bytes: 0
+            }};
+            if (isTable) {{
+                entry.kind = 'table';
+            }} else if (contentType.startsWith('image/')) {{
+                entry.kind = 'image';
+                // 扩展名不在 imageExts 中时 HEAD 没有正文，补一次 GET
+                const body = method === 'HEAD' ? await fetch(url, {{ signal }}) : response;
+                if (!body.ok) {{
+                    throw new Error('HTTP ' + body.status);
+                }}
+                entry.blob = await body.blob();
+                entry.bytes = entry.blob.size;
+            }} else if (isText) {{
+                entry.kind = 'text';
+                entry.text = decodeText(await response.arrayBuffer(), meta.encoding || charset);
+                entry.bytes = entry.text.length * 2;
+            }} else if (response.body) {{
+                // 不可预览的文件不读取正文
+                response.body.cancel();
+            }}
+            cachePut(url, entry);
+            return entry;
+        }}
+        
+        // 同一文件的悬停预取与点击共享一次请求；pinned 表示已被点击使用，不可再取消
+        function requestPreview(item, url, pinned) {{
+            let pending = inflightPreviews.get(url);
+            if (!pending || pending.controller.signal.aborted) {{
+                const controller = new AbortController();
+                const current = {{ controller, pinned: false }};
+                const meta = {{ kind: item.dataset.kind, encoding: item.dataset.encoding }};
+                current.promise = fetchPreviewEntry(url, controller.signal, meta).finally(() => {{
+                    if (inflightPreviews.get(url) === current) inflightPreviews.delete(url);
+                }});
+                inflightPreviews.set(url, current);
+                pending = current;
+            }}
+            if (pinned) pending.pinned = true;
+            return pending.promise;
+        }}
+        
+        function schedulePrefetch(item) {{
+            cancelPrefetch();
+            const url = item.dataset.url;
+            if (!url || url.endsWith('/') || previewCache.has(url)) return;
+            if (Number(item.dataset.size || 0) > PREFETCH_MAX_BYTES) return;
+            prefetchTimer = setTimeout(() => {{
+                prefetchTimer = null;
+                prefetchUrl = url;
+                requestPreview(item, url, false).catch(() => {{}});
+            }}, PREFETCH_DELAY_MS);
+        }}
+        
+        function cancelPrefetch() {{
+            clearTimeout(prefetchTimer);
+            prefetchTimer = null;
+            const pending = prefetchUrl && inflightPreviews.get(prefetchUrl);
+            if (pending && !pending.pinned) {{
+                pending.controller.abort();
+            }}
+            prefetchUrl = null;
+        }}
+        
+        function showPreviewEntry(url, entry) {{
+            resetPreviewState();
+            const ext = getFileExt(url);
+            currentFileExt = ext;
+            updateMdPreviewButton();
+            
+            if (entry.kind === 'image') {{
+                currentImageUrl = URL.createObjectURL(entry.blob);
+                document.getElementById('image-preview').src = currentImageUrl;
+                document.getElementById('image-preview-wrap').style.display = 'flex';
+            }} else if (entry.kind === 'text') {{
+                if (!entry.doc) {{
+                    entry.doc = CodeMirror.Doc(entry.text, langMap[ext] || 'text');
+                    entry.text = null;
+                }}
+                showEditorDoc(entry.doc);
+            }} else if (entry.kind === 'table') {{
+                openTableView(url);
+            }} else {{
+                // 二进制文件：十六进制查看器
+                downloadLink.href = url;
+                downloadLink.style.display = 'inline-block';
+                openHexView(url, entry.size);
+            }}
+        }}
+        
+        async function openPreview(item, url) {{
+            const name = url.split('/').pop();
+            const token = ++previewToken;
+            
+            // 高亮选中
+            document.querySelectorAll('.file-item').forEach(i => i.classList.remove('active'));
+            item.classList.add('active');
+            document.getElementById('preview-title').textContent = '📄 ' + name;
+            
+            // 命中缓存立即渲染，随后在后台校验；内容有变化再重新渲染
+            const cached = cacheGet(url);
+            if (cached) {{
+                showPreviewEntry(url, cached);
+            }} else {{
+                resetPreviewState();
+            }}
+            
+            try {{
+                const entry = await requestPreview(item, url, true);
+                if (token !== previewToken || entry === cached) return;
+                showPreviewEntry(url, entry);
+            }} catch (err) {{
+                if (token !== previewToken || cached) return;
+                document.getElementById('preview-empty').textContent = 'Error: ' + err.message;
+                document.getElementById('preview-empty').style.display = 'flex';
+            }}
+        }}
+        
         document.querySelectorAll('.file-item').forEach(item => {{
-            item.addEventListener('click', async (e) => {{
+            item.addEventListener('click', (e) => {{
                 if (item.classList.contains('parent-item')) {{
                     navigateTo(getParentUrlFromBreadcrumb());
                     return;
@@ -541,68 +2919,26 @@ class WorkspaceBrowserHandler(SimpleHTTPRequestHandler):
                 }}
                 
                 // 文件 - 预览
-                const name = url.split('/').pop();
-                
-                // 高亮选中
-                document.querySelectorAll('.file-item').forEach(i => i.classList.remove('active'));
-                item.classList.add('active');
-                
-                document.getElementById('preview-title').textContent = '📄 ' + name;
-                resetPreviewState();
-                
-                try {{
-                    const response = await fetch(url);
-                    if (!response.ok) {{
-                        throw new Error('HTTP ' + response.status);
-                    }}
-                    
-                    const contentType = (response.headers.get('content-type') || '').toLowerCase();
-                    const ext = name.split('.').pop().toLowerCase();
-                    const textExts = ['md', 'txt', 'py', 'js', 'ts', 'json', 'html', 'css', 'sh', 'yaml', 'yml', 'xml', 'log', 'cfg', 'conf', 'ini'];
-                    currentFileExt = ext;
-                    markdownPreviewMode = false;
-                    updateMdPreviewButton();
-                    
-                    if (contentType.startsWith('image/')) {{
-                        const blob = await response.blob();
-                        currentImageUrl = URL.createObjectURL(blob);
-                        document.getElementById('image-preview').src = currentImageUrl;
-                        document.getElementById('image-preview-wrap').style.display = 'flex';
-                    }} else if (
-                        textExts.includes(ext) ||
-                        contentType.startsWith('text/') ||
-                        contentType.includes('json') ||
-                        contentType.includes('xml')
-                    ) {{
-                        const text = await response.text();
-                        const langMap = {{
-                            'py': 'python', 'js': 'javascript', 'ts': 'typescript',
-                            'json': 'json', 'html': 'htmlmixed', 'css': 'css',
-                            'md': 'markdown', 'xml': 'xml', 'yaml': 'yaml',
-                            'yml': 'yaml', 'sh': 'shell', 'ini': 'properties',
-                            'cfg': 'properties', 'conf': 'properties',
-                            'log': 'text', 'txt': 'text'
-                        }};
-                            
-                        const mode = langMap[ext] || 'text';
-                        
-                        setSourceViewVisible(true);
-                        document.getElementById('code').value = text;
-                        editor = CodeMirror.fromTextArea(document.getElementById('code'), {{
-                            mode: mode,
-                            theme: 'dracula',
-                            lineNumbers: true,
-                            readOnly: true,
-                            viewportMargin: Infinity
-                        }});
-                    }} else {{
-                        document.getElementById('preview-empty').innerHTML = 
-                            'Preview not available<br><a href="' + url + '" style="color:#00d9ff">Download</a>';
-                        document.getElementById('preview-empty').style.display = 'flex';
+                openPreview(item, url);
+            }});
+            
+            // 悬停或键盘聚焦时预取，离开时取消未完成的请求
+            item.addEventListener('mouseenter', () => schedulePrefetch(item));
+            item.addEventListener('mouseleave', cancelPrefetch);
+            item.addEventListener('focus', () => schedulePrefetch(item));
+            item.addEventListener('blur', cancelPrefetch);
+            
+            item.addEventListener('keydown', (e) => {{
+                if (e.key === 'Enter') {{
+                    item.click();
+                }} else if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {{
+                    const visible = Array.from(document.querySelectorAll('.file-item'))
+                        .filter(i => i.style.display !== 'none');
+                    const next = visible[visible.indexOf(item) + (e.key === 'ArrowDown' ? 1 : -1)];
+                    if (next) {{
+                        e.preventDefault();
+                        next.focus();
                     }}
-                }} catch (err) {{
-                    document.getElementById('preview-empty').textContent = 'Error: ' + err.message;
-                    document.getElementById('preview-empty').style.display = 'flex';
                 }}
             }});
         }});
@@ -706,24 +3042,119 @@ class WorkspaceBrowserHandler(SimpleHTTPRequestHandler):
                 document.body.style.userSelect = '';
             }}
         }});
+        
+        // 重复文件报告：在后台任务完成前定期轮询进度
+        const DUPLICATES_POLL_MS = 1000;
+        const DUPLICATE_PHASES = {{ scan: '按大小分组', partial: '比较首尾块', full: '计算完整摘要' }};
+        const duplicatesViewEl = document.getElementById('duplicates-view');
+        let duplicatesState = null;
+        
+        function formatSize(size) {{
+            for (const unit of ['B', 'KB', 'MB', 'GB']) {{
+                if (size < 1024) return size.toFixed(1) + ' ' + unit;
+                size /= 1024;
+            }}
+            return size.toFixed(1) + ' TB';
+        }}
+        
+        function fileLocationUrl(path) {{
+            // 链接到文件所在目录，并通过 #file= 定位到该文件
+            const slash = path.lastIndexOf('/');
+            const dir = slash >= 0 ? path.slice(0, slash + 1) : '';
+            const name = path.slice(slash + 1);
+            return '/' + dir.split('/').map(encodeURIComponent).join('/') + '#file=' + encodeURIComponent(name);
+        }}
+        
+        function closeDuplicatesView() {{
+            if (!duplicatesState) return;
+            duplicatesState.controller.abort();
+            clearTimeout(duplicatesState.timer);
+            duplicatesState = null;
+            duplicatesViewEl.style.display = 'none';
+            duplicatesViewEl.innerHTML = '';
+        }}
+        
+        async function findDuplicates() {{
+            previewToken++;
+            document.querySelectorAll('.file-item').forEach(i => i.classList.remove('active'));
+            resetPreviewState();
+            document.getElementById('preview-title').textContent = '🔍 重复文件';
+            const state = {{ controller: new AbortController(), timer: null }};
+            duplicatesState = state;
+            duplicatesViewEl.style.display = 'block';
+            duplicatesViewEl.textContent = '正在启动…';
+            try {{
+                const response = await fetch(
+                    '/api/duplicates?path=' + encodeURIComponent(decodeURIComponent(location.pathname)),
+                    {{ method: 'POST', signal: state.controller.signal }}
+                );
+                if (!response.ok) throw new Error('HTTP ' + response.status);
+                const job = await response.json();
+                pollDuplicates(state, job.id);
+            }} catch (err) {{
+                if (state === duplicatesState && err.name !== 'AbortError') {{
+                    duplicatesViewEl.textContent = 'Error: ' + err.message;
+                }}
+            }}
+        }}
+        
+        async function pollDuplicates(state, id) {{
+            try {{
+                const response = await fetch('/api/duplicates?id=' + id, {{ signal: state.controller.signal }});
+                if (!response.ok) throw new Error('HTTP ' + response.status);
+                const job = await response.json();
+                if (state !== duplicatesState) return;
+                renderDuplicates(job);
+                if (job.state === 'running') {{
+                    state.timer = setTimeout(() => pollDuplicates(state, id), DUPLICATES_POLL_MS);
+                }}
+            }} catch (err) {{
+                if (state === duplicatesState && err.name !== 'AbortError') {{
+                    duplicatesViewEl.textContent = 'Error: ' + err.message;
+                }}
+            }}
+        }}
+        
+        function renderDuplicates(job) {{
+            const status = job.state === 'running' ? '⏳ ' + DUPLICATE_PHASES[job.phase]
+                : job.state === 'done' ? '✅ 完成' : '❌ ' + escapeHtml(job.error || '');
+            let html = '<p>' + status + ' · 已扫描 ' + job.files_scanned + ' 个文件 · 候选 ' + job.candidates
+                + ' · 已读取 ' + formatSize(job.hashed_bytes) + ' · 用时 ' + job.elapsed.toFixed(1) + 's</p>';
+            if (job.state === 'done') {{
+                html += '<p>共 ' + job.total_groups + ' 组重复，可节省 ' + formatSize(job.wasted_bytes)
+                    + (job.groups.length < job.total_groups ? '（仅列出前 ' + job.groups.length + ' 组）' : '') + '</p>';
+                for (const group of job.groups) {{
+                    html += '<div class="dup-group"><div class="dup-group-header">'
+                        + formatSize(group.size) + ' × ' + group.paths.length + '</div><ul>';
+                    for (const path of group.paths) {{
+                        html += '<li><a href="' + escapeHtml(fileLocationUrl(path)) + '">' + escapeHtml(path) + '</a></li>';
+                    }}
+                    html += '</ul></div>';
+                }}
+            }}
+            duplicatesViewEl.innerHTML = html;
+        }}
+        
+        // 从重复文件报告跳转过来时定位并预览指定文件
+        const linkedFile = new URLSearchParams(location.hash.slice(1)).get('file');
+        if (linkedFile) {{
+            const dirUrl = decodeURIComponent(location.pathname);
+            const target = Array.from(document.querySelectorAll('.file-item'))
+                .find(i => i.dataset.url === dirUrl + linkedFile);
+            if (target) {{
+                target.focus();
+                target.click();
+            }}
+        }}
     </script>
 </body>
 </html>'''
-            
-            self.send_response(200)
-            self.send_header('Content-Type', 'text/html; charset=utf-8')
-            self.send_header('Content-Length', str(len(html.encode())))
-            self.end_headers()
-            self.wfile.write(html.encode())
-            
-        except Exception as e:
-            self.send_error(500, str(e))
+        
+        return html.encode()
     
     def preview_file(self, path):
         """直接预览文件"""
-        import cgi
         ext = os.path.basename(path).rsplit('.', 1)[-1].lower() if '.' in path else ''
-        text_extensions = {'md', 'txt', 'py', 'js', 'ts', 'json', 'html', 'css', 'sh', 'yaml', 'yml', 'xml', 'log', 'cfg', 'conf', 'ini'}
         
         lang_map = {
             'py': 'python', 'js': 'javascript', 'ts': 'typescript',
@@ -735,9 +3166,15 @@ class WorkspaceBrowserHandler(SimpleHTTPRequestHandler):
         }
         lang = lang_map.get(ext, 'text')
         
-        if ext in text_extensions:
+        # 按内容嗅探（只读文件开头）决定是否预览及使用的编码
+        try:
+            kind, encoding = classify_file(path, file_key(os.stat(path)))
+        except OSError:
+            return super().do_GET()
+        
+        if kind == 'text':
             try:
-                with open(path, 'r', encoding='utf-8') as f:
+                with open(path, 'r', encoding=text_codec(encoding), errors='replace') as f:
                     content = f.read()
                 
                 content = content.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
@@ -852,8 +3289,6 @@ class WorkspaceBrowserHandler(SimpleHTTPRequestHandler):
                 self.end_headers()
                 self.wfile.write(html.encode('utf-8'))
                 
-            except UnicodeDecodeError:
-                return super().do_GET()
             except Exception as e:
                 self.send_error(500, str(e))
         else:
@@ -903,13 +3338,20 @@ class WorkspaceBrowserHandler(SimpleHTTPRequestHandler):
 
 def main():
     os.chdir(WORKSPACE)
-    server = HTTPServer(('0.0.0.0', PORT), WorkspaceBrowserHandler)
+    warm_dirs = LISTING_CACHE.load(snapshot_file())
+    HASH_CACHE.open(os.path.join(STATE_DIR, 'hashes.bin'))
+    start_snapshot_saver()
+    start_recent_crawler()
+    server = ThreadingHTTPServer(('0.0.0.0', PORT), WorkspaceBrowserHandler)
     print(f"🚀 Workspace Browser running at http://0.0.0.0:{PORT}")
     print(f"📁 Serving: {WORKSPACE}")
+    print(f"💾 Snapshot: {warm_dirs} directories loaded from {snapshot_file()}")
     try:
         server.serve_forever()
     except KeyboardInterrupt:
         print("\n👋 Stopped")
+    finally:
+        LISTING_CACHE.save(snapshot_file())
 
 if __name__ == '__main__':
     main()
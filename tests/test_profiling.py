@@ -0,0 +1,71 @@
+"""性能分析模式的回归测试：被分析的大目录列表页耗时应与未分析时同一量级"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server
+
+LARGE_DIR_FILES = 10000
+# 允许的倍数与绝对余量（秒）：cProfile 本身有数倍开销，但不能随文件数平方增长
+MAX_SLOWDOWN = 5
+SLACK_SECONDS = 1.0
+
+
+class QuietHandler(server.WorkspaceBrowserHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class ProfiledListingTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.workspace = tempfile.mkdtemp()
+        big = os.path.join(cls.workspace, 'big')
+        os.mkdir(big)
+        for i in range(LARGE_DIR_FILES):
+            with open(os.path.join(big, f'file_{i:05d}.txt'), 'w') as f:
+                f.write('x')
+        cls.saved = (server.WORKSPACE, server.STATE_DIR)
+        server.WORKSPACE = cls.workspace
+        server.STATE_DIR = os.path.join(cls.workspace, '.state')
+        cls.httpd = server.ThreadingHTTPServer(('127.0.0.1', 0), QuietHandler)
+        threading.Thread(target=cls.httpd.serve_forever, daemon=True).start()
+        cls.base = f'http://127.0.0.1:{cls.httpd.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.httpd.shutdown()
+        cls.httpd.server_close()
+        server.WORKSPACE, server.STATE_DIR = cls.saved
+        shutil.rmtree(cls.workspace)
+
+    def fetch(self, path):
+        start = time.perf_counter()
+        with urllib.request.urlopen(self.base + path, timeout=120) as response:
+            body = response.read()
+        return body, time.perf_counter() - start
+
+    def test_profiled_listing_stays_linear(self):
+        # 预热目录快照与内容分类缓存，两次请求只比较渲染开销
+        self.fetch('/big/')
+        body, plain = self.fetch('/big/')
+        profiled_body, profiled = self.fetch('/big/?profile=1')
+        self.assertEqual(body.count(b'class="file-item"'), LARGE_DIR_FILES)
+        self.assertEqual(profiled_body.count(b'class="file-item"'), LARGE_DIR_FILES)
+        self.assertLess(profiled, plain * MAX_SLOWDOWN + SLACK_SECONDS)
+
+        listing, _ = self.fetch('/api/profiles')
+        profiles = json.loads(listing)['profiles']
+        self.assertTrue(any(p['path'] == '/big/?profile=1' and p['reason'] == 'requested' for p in profiles))
+
+
+if __name__ == '__main__':
+    unittest.main()